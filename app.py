@@ -1,29 +1,48 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, Response
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-import csv
-import io
-from models import db, Person, InventoryItem, User, AuditLog
+from flask import Blueprint, Flask, abort, current_app, render_template, request, redirect, url_for, flash, Response, stream_with_context, jsonify
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
+from models import db, Person, InventoryItem, User, AuditLog, ItemAssignment
+from pagination import paginate
+from cache import TTLCache, table_version
+from search import install_index, rebuild_index, search_people, search_items, lookup_people
+from config import Config
+import database
+import instrumentation
+import audit
+import conditional
+import counters
+import history
+import user_cache
+from passwords import HashingBusy, check_password, hash_password, verify_password
+from audit_archive import archive_older_than
+from importer import CsvImportError, ImportResult, open_upload, import_people, import_items
+from bulk import BulkOperationError, run as run_bulk_operation
+from exporter import DATASETS as EXPORT_DATASETS, FORMATS as EXPORT_FORMATS, ExportError, build_export, generate as generate_export
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 import os
 import socket
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
+import click
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-replace-this'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///db.sqlite3'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+bp = Blueprint('main', __name__, cli_group=None)
 
-db.init_app(app)
+AUDIT_ACTIONS = ['create', 'update', 'delete', 'login', 'logout', 'export']
+AUDIT_MODEL_TYPES = ['Person', 'InventoryItem', 'User', 'AuditLog']
+
+people_lookup_cache = TTLCache(maxsize=2048)
+results_fragment_cache = TTLCache(maxsize=512)
+# Request args that select a page of live search results
+RESULTS_ARGS = ('sort', 'dir', 'after', 'before', 'per_page')
+# Date filters on the assignment history pages; 'at' asks who held what on that day
+HISTORY_FILTERS = ('date_from', 'date_to', 'at')
 
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load_user(user_id)
 
 # Decorator to restrict routes to admin users
 def admin_required(f):
@@ -31,112 +50,297 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated or current_user.role != 'admin':
             flash('You do not have permission to perform this action.', 'error')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
+        # The cached user may predate a demotion or password change made in another worker
+        if not user_cache.is_current(current_user):
+            logout_user()
+            flash('Your account has changed. Please log in again.', 'error')
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
 def log_action(action, model_type, model_id, user_id, details=None):
-    audit = AuditLog(
-        action=action,
-        model_type=model_type,
-        model_id=model_id,
-        user_id=user_id,
-        details=details
-    )
-    db.session.add(audit)
-    db.session.commit()
+    # Queued for the group-committing writer, or joined to the caller's
+    # transaction when AUDIT_MODE is 'transaction' (see audit.py)
+    audit.record(action, model_type, model_id, user_id, details)
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password, password):
+        database.release_connection(db.session, user)
+        try:
+            valid = user is not None and verify_password(user, password)
+        except HashingBusy:
+            flash('The server is busy, please try again in a moment.', 'error')
+            return render_template('login.html'), 503
+        if valid:
             login_user(user)
             log_action('login', 'User', user.id, user.id, f'User {username} logged in')
-            return redirect(url_for('index'))
+            db.session.commit()
+            return redirect(url_for('main.index'))
         flash('Invalid username or password', 'error')
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     user_id = current_user.id
     username = current_user.username
     logout_user()
     log_action('logout', 'User', user_id, user_id, f'User {username} logged out')
-    return redirect(url_for('login'))
+    db.session.commit()
+    return redirect(url_for('main.login'))
 
-@app.route('/')
+@bp.route('/')
 @login_required
 def index():
-    recent_changes = AuditLog.query.order_by(AuditLog.timestamp.desc()).limit(10).all()
-    total_items = InventoryItem.query.count()
-    total_people = Person.query.count()
+    recent_changes = AuditLog.query.options(joinedload(AuditLog.user)).order_by(AuditLog.timestamp.desc()).limit(10).all()
+    stats = counters.summary()
     recent_changes_with_users = []
     for change in recent_changes:
-        user = User.query.get(change.user_id)
         recent_changes_with_users.append({
             'action': change.action,
             'model_type': change.model_type,
             'details': change.details,
-            'username': user.username if user else 'Unknown',
+            'username': change.user.username if change.user else 'Unknown',
             'timestamp': change.timestamp
         })
-    return render_template('index.html', recent_changes=recent_changes_with_users, total_items=total_items, total_people=total_people, user_role=current_user.role)
+    return render_template('index.html', recent_changes=recent_changes_with_users, total_items=stats['items'], total_people=stats['people'], stats=stats, user_role=current_user.role)
+
+def _employee_results(search_query):
+    query, score = search_people(Person.query, search_query)
+    sortable = {
+        'name': (Person.last_name, Person.first_name),
+        'department': (Person.department,),
+        'email': (Person.email,),
+    }
+    if score is not None:
+        sortable['relevance'] = (score,)
+    page = paginate(
+        query,
+        sortable=sortable,
+        default_sort='relevance' if score is not None else 'name',
+        id_column=Person.id,
+        count_key=('employees', search_query),
+        count_tables=('person',),
+        extra_args={'search': search_query},
+    )
+    # One grouped count for the whole page instead of lazy-loading person.items per row
+    item_counts = dict(
+        db.session.query(InventoryItem.assigned_to_id, func.count(InventoryItem.id))
+        .filter(InventoryItem.assigned_to_id.in_([p.id for p in page.items]))
+        .group_by(InventoryItem.assigned_to_id)
+        .all()
+    ) if page.items else {}
+    return {'people': page.items, 'page': page, 'item_counts': item_counts, 'search_query': search_query}
 
-@app.route('/employees', methods=['GET', 'POST'])
+def _asset_results(search_query):
+    query = InventoryItem.query.outerjoin(Person).options(contains_eager(InventoryItem.person))
+    query, score = search_items(query, search_query)
+    sortable = {
+        'type': (InventoryItem.item_type,),
+        'serial': (InventoryItem.serial_number,),
+        'details': (func.coalesce(InventoryItem.details, ''),),
+        'assigned_to': (func.coalesce(Person.last_name, ''), func.coalesce(Person.first_name, '')),
+        'status': (InventoryItem.status,),
+    }
+    if score is not None:
+        sortable['relevance'] = (score,)
+    page = paginate(
+        query,
+        sortable=sortable,
+        default_sort='relevance' if score is not None else 'type',
+        id_column=InventoryItem.id,
+        count_key=('assets', search_query),
+        count_tables=('inventory_item', 'person'),
+        extra_args={'search': search_query},
+    )
+    return {'items': page.items, 'page': page, 'search_query': search_query}
+
+def _results_fragment(template, build, tables):
+    """Render just the results card for the live search, cached per query, page, role and data version."""
+    validator = conditional.for_tables(*tables)
+    if validator is not None and validator.is_fresh():
+        return validator.not_modified()
+    search_query = request.args.get('search', '').strip()
+    state = validator.state if validator is not None else conditional.table_state(*tables)[0]
+    # The data version comes from the database, so writes made by other workers invalidate it too
+    cache_key = (template, current_user.role, search_query, tuple(request.args.get(arg, '') for arg in RESULTS_ARGS), state)
+    html = results_fragment_cache.get_or_set(
+        cache_key,
+        lambda: render_template(template, user_role=current_user.role, **build(search_query)),
+        ttl=current_app.config['SEARCH_RESULTS_CACHE_TTL'],
+    )
+    return conditional.respond(validator, html)
+
+@bp.route('/employees', methods=['GET', 'POST'])
 @login_required
 def employees():
-    search_query = request.form.get('search', '') if request.method == 'POST' else ''
-    query = Person.query
-    if search_query:
-        query = query.filter(
-            (Person.first_name.ilike(f'%{search_query}%')) |
-            (Person.last_name.ilike(f'%{search_query}%')) |
-            (Person.email.ilike(f'%{search_query}%')) |
-            (Person.department.ilike(f'%{search_query}%'))
-        )
-    people = query.all()
-    return render_template('employees.html', people=people, search_query=search_query, user_role=current_user.role)
+    validator = conditional.for_tables('person', 'inventory_item')
+    if validator is not None and validator.is_fresh():
+        return validator.not_modified()
+    search_query = request.values.get('search', '').strip()
+    return conditional.respond(validator, render_template('employees.html', user_role=current_user.role, **_employee_results(search_query)))
+
+@bp.route('/employees/results')
+@login_required
+def employees_results():
+    return _results_fragment('_employees_results.html', _employee_results, ('person', 'inventory_item'))
 
-@app.route('/users', methods=['GET', 'POST'])
+@bp.route('/users', methods=['GET', 'POST'])
 @admin_required
 def users():
-    search_query = request.form.get('search', '') if request.method == 'POST' else ''
+    search_query = request.values.get('search', '').strip()
     query = User.query
     if search_query:
         query = query.filter(
             (User.username.ilike(f'%{search_query}%')) |
             (User.role.ilike(f'%{search_query}%'))
         )
-    users = query.all()
-    return render_template('users.html', users=users, search_query=search_query)
+    page = paginate(
+        query,
+        sortable={
+            'username': (User.username,),
+            'role': (User.role,),
+        },
+        default_sort='username',
+        id_column=User.id,
+        count_key=('users', search_query),
+        count_tables=('user',),
+        extra_args={'search': search_query},
+    )
+    return render_template('users.html', users=page.items, page=page, search_query=search_query)
 
-@app.route('/assets', methods=['GET', 'POST'])
+@bp.route('/assets', methods=['GET', 'POST'])
 @login_required
 def assets():
-    search_query = request.form.get('search', '') if request.method == 'POST' else ''
-    query = InventoryItem.query
-    if search_query:
-        query = query.join(Person, isouter=True).filter(
-            (InventoryItem.item_type.ilike(f'%{search_query}%')) |
-            (InventoryItem.serial_number.ilike(f'%{search_query}%')) |
-            (InventoryItem.details.ilike(f'%{search_query}%')) |
-            (Person.first_name.ilike(f'%{search_query}%')) |
-            (Person.last_name.ilike(f'%{search_query}%'))
-        )
-    items = query.all()
-    return render_template('assets.html', items=items, search_query=search_query, user_role=current_user.role)
+    validator = conditional.for_tables('inventory_item', 'person')
+    if validator is not None and validator.is_fresh():
+        return validator.not_modified()
+    search_query = request.values.get('search', '').strip()
+    return conditional.respond(validator, render_template('assets.html', user_role=current_user.role, **_asset_results(search_query)))
 
-@app.route('/person/<int:id>')
+@bp.route('/assets/results')
+@login_required
+def assets_results():
+    return _results_fragment('_assets_results.html', _asset_results, ('inventory_item', 'person'))
+
+@bp.route('/person/<int:id>')
 @login_required
 def person_detail(id):
-    person = Person.query.get_or_404(id)
-    return render_template('person_detail.html', person=person, user_role=current_user.role)
+    validator = conditional.for_person(id)
+    if validator is not None and validator.is_fresh():
+        return validator.not_modified()
+    person = Person.query.options(selectinload(Person.items)).get_or_404(id)
+    return conditional.respond(validator, render_template('person_detail.html', person=person, user_role=current_user.role))
+
+def _history_window(filters):
+    """Parse the history filters into a [start, end) window and an as-of moment; raises ValueError.
+
+    ``at`` is a day; the as-of answer is for the end of that day.
+    """
+    start = datetime.strptime(filters['date_from'], '%Y-%m-%d') if filters['date_from'] else None
+    end = datetime.strptime(filters['date_to'], '%Y-%m-%d') + timedelta(days=1) if filters['date_to'] else None
+    at = datetime.strptime(filters['at'], '%Y-%m-%d') + timedelta(days=1, microseconds=-1) if filters['at'] else None
+    return start, end, at
+
+@bp.route('/person/<int:id>/history')
+@login_required
+def person_history(id):
+    person = db.session.get(Person, id)
+    filters = {key: request.args.get(key, '').strip() for key in HISTORY_FILTERS}
+    try:
+        start, end, at = _history_window(filters)
+    except ValueError:
+        flash('Invalid date.', 'error')
+        return redirect(url_for('main.person_history', id=id))
+    page = paginate(
+        history.person_timeline(id, start, end),
+        sortable={'started': (ItemAssignment.started_at,)},
+        default_sort='started',
+        default_direction='desc',
+        id_column=ItemAssignment.id,
+        count_key=None,
+        count_tables=('item_assignment',),
+        extra_args=dict(filters, id=id),
+    )
+    # People who have been deleted keep their history
+    if person is None and not page.items and not any(filters.values()):
+        abort(404)
+    held = history.held_at(id, at) if at else None
+    return render_template('person_history.html', person=person, person_id=id, assignments=page.items, page=page, filters=filters, held=held)
+
+@bp.route('/item/<int:id>/history')
+@login_required
+def item_history(id):
+    item = db.session.get(InventoryItem, id)
+    filters = {key: request.args.get(key, '').strip() for key in HISTORY_FILTERS}
+    try:
+        start, end, at = _history_window(filters)
+    except ValueError:
+        flash('Invalid date.', 'error')
+        return redirect(url_for('main.item_history', id=id))
+    assignments = history.item_timeline(id, start, end)
+    if item is None and not assignments and not any(filters.values()):
+        abort(404)
+    holder = history.holder_at(id, at) if at else None
+    return render_template('item_history.html', item=item, item_id=id, assignments=assignments, filters=filters, holder=holder)
+
+@bp.route('/history')
+@login_required
+def item_history_lookup():
+    serial_number = request.args.get('serial_number', '').strip()
+    filters = {key: request.args.get(key, '').strip() for key in HISTORY_FILTERS}
+    item_id = db.session.query(InventoryItem.id).filter_by(serial_number=serial_number).scalar() if serial_number else None
+    if item_id is None and serial_number:
+        # Deleted items are gone from inventory_item; their assignments keep the serial
+        item_id = (db.session.query(ItemAssignment.item_id)
+                   .filter(ItemAssignment.serial_number == serial_number)
+                   .order_by(ItemAssignment.started_at.desc())
+                   .limit(1).scalar())
+    if item_id is None:
+        flash(f'No item with serial number {serial_number}.' if serial_number else 'Enter a serial number.', 'error')
+        return redirect(url_for('main.assets'))
+    return redirect(url_for('main.item_history', id=item_id, **{k: v for k, v in filters.items() if v}))
 
-@app.route('/add-user', methods=['GET', 'POST'])
+@bp.route('/api/people')
+@login_required
+def people_lookup():
+    search_query = request.args.get('q', '').strip()
+    max_limit = current_app.config['PEOPLE_LOOKUP_LIMIT']
+    limit = max(1, min(request.args.get('limit', max_limit, type=int) or max_limit, max_limit))
+    ttl = current_app.config['PEOPLE_LOOKUP_TTL']
+    cache_key = (search_query.lower(), limit, table_version('person'))
+    results = people_lookup_cache.get_or_set(cache_key, lambda: [
+        {
+            'id': p.id,
+            'name': f'{p.first_name} {p.last_name}',
+            'email': p.email,
+            'department': p.department,
+        }
+        for p in lookup_people(search_query, limit)
+    ], ttl=ttl)
+    response = jsonify(results)
+    response.cache_control.private = True
+    response.cache_control.max_age = ttl
+    return response
+
+@bp.route('/api/items/bulk', methods=['POST'])
+@login_required
+def bulk_items():
+    if current_user.role != 'admin' or not user_cache.is_current(current_user):
+        return jsonify(error='You do not have permission to perform this action.'), 403
+    try:
+        result = run_bulk_operation(request.get_json(silent=True), current_user.id, current_app.config['BULK_MAX_ITEMS'])
+    except BulkOperationError as e:
+        db.session.rollback()
+        return jsonify(error=str(e)), 400
+    return jsonify(result.as_dict()), 200 if result.applied else 409
+
+@bp.route('/add-user', methods=['GET', 'POST'])
 @admin_required
 def add_user():
     if request.method == 'POST':
@@ -145,13 +349,19 @@ def add_user():
         role = request.form.get('role', 'read_only')
         if not all([username, password]):
             flash('Username and password are required.', 'error')
-            return redirect(url_for('add_user'))
+            return redirect(url_for('main.add_user'))
         if User.query.filter_by(username=username).first():
             flash('Username already exists.', 'error')
-            return redirect(url_for('add_user'))
+            return redirect(url_for('main.add_user'))
+        database.release_connection(db.session)
+        try:
+            password_hash = hash_password(password)
+        except HashingBusy:
+            flash('The server is busy, please try again in a moment.', 'error')
+            return redirect(url_for('main.add_user'))
         user = User(
             username=username,
-            password=generate_password_hash(password),
+            password=password_hash,
             role=role
         )
         db.session.add(user)
@@ -159,10 +369,10 @@ def add_user():
         log_action('create', 'User', user.id, current_user.id, f'Created user: {username} ({role})')
         db.session.commit()
         flash('User created successfully.', 'success')
-        return redirect(url_for('users'))
+        return redirect(url_for('main.users'))
     return render_template('add_user.html')
 
-@app.route('/change-password', methods=['GET', 'POST'])
+@bp.route('/change-password', methods=['GET', 'POST'])
 @login_required
 def change_password():
     if request.method == 'POST':
@@ -171,22 +381,31 @@ def change_password():
         confirm_password = request.form.get('confirm_password', '').strip()
         if not all([current_password, new_password, confirm_password]):
             flash('All fields are required.', 'error')
-            return redirect(url_for('change_password'))
+            return redirect(url_for('main.change_password'))
         if new_password != confirm_password:
             flash('New password and confirmation do not match.', 'error')
-            return redirect(url_for('change_password'))
-        if not check_password_hash(current_user.password, current_password):
-            flash('Current password is incorrect.', 'error')
-            return redirect(url_for('change_password'))
-        current_user.password = generate_password_hash(new_password)
+            return redirect(url_for('main.change_password'))
+        # current_user is a cached snapshot; load the row to verify and update it
+        user = db.session.get(User, current_user.id)
+        database.release_connection(db.session, user)
+        try:
+            if not check_password(user.password, current_password):
+                flash('Current password is incorrect.', 'error')
+                return redirect(url_for('main.change_password'))
+            user.password = hash_password(new_password)
+        except HashingBusy:
+            flash('The server is busy, please try again in a moment.', 'error')
+            return redirect(url_for('main.change_password'))
         db.session.flush()
-        log_action('update', 'User', current_user.id, current_user.id, f'Changed password for user: {current_user.username}')
+        log_action('update', 'User', user.id, user.id, f'Changed password for user: {user.username}')
         db.session.commit()
+        # The password change bumped the user's version; re-issue this session so only others are logged out
+        login_user(user)
         flash('Password changed successfully.', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('change_password.html')
 
-@app.route('/change-user-password/<int:id>', methods=['GET', 'POST'])
+@bp.route('/change-user-password/<int:id>', methods=['GET', 'POST'])
 @admin_required
 def change_user_password(id):
     user = User.query.get_or_404(id)
@@ -195,75 +414,94 @@ def change_user_password(id):
         confirm_password = request.form.get('confirm_password', '').strip()
         if not all([new_password, confirm_password]):
             flash('New password and confirmation are required.', 'error')
-            return redirect(url_for('change_user_password', id=id))
+            return redirect(url_for('main.change_user_password', id=id))
         if new_password != confirm_password:
             flash('New password and confirmation do not match.', 'error')
-            return redirect(url_for('change_user_password', id=id))
-        user.password = generate_password_hash(new_password)
+            return redirect(url_for('main.change_user_password', id=id))
+        database.release_connection(db.session, user)
+        try:
+            user.password = hash_password(new_password)
+        except HashingBusy:
+            flash('The server is busy, please try again in a moment.', 'error')
+            return redirect(url_for('main.change_user_password', id=id))
         db.session.flush()
         log_action('update', 'User', user.id, current_user.id, f'Admin {current_user.username} changed password for user: {user.username}')
         db.session.commit()
+        if user.id == current_user.id:
+            login_user(user)
         flash(f'Password changed successfully for {user.username}.', 'success')
-        return redirect(url_for('users'))
+        return redirect(url_for('main.users'))
     return render_template('change_user_password.html', user=user)
 
-@app.route('/import-csv', methods=['GET', 'POST'])
+@bp.route('/import-csv', methods=['GET', 'POST'])
 @admin_required
 def import_csv():
     if request.method == 'POST':
         if 'csv_file' not in request.files:
             flash('No file uploaded', 'error')
-            return redirect(url_for('import_csv'))
+            return redirect(url_for('main.import_csv'))
         file = request.files['csv_file']
         if file.filename == '':
             flash('No file selected', 'error')
-            return redirect(url_for('import_csv'))
+            return redirect(url_for('main.import_csv'))
+        kind = request.form.get('kind', 'people')
+        importer = import_items if kind == 'items' else import_people
+        result = ImportResult('items' if kind == 'items' else 'people')
         try:
-            stream = io.StringIO(file.stream.read().decode('UTF8'), newline=None)
-            reader = csv.DictReader(stream)
-            required_fields = {'first_name', 'last_name', 'department'}
-            if not required_fields.issubset(reader.fieldnames):
-                flash('CSV must include columns: first_name, last_name, department (email is optional)', 'error')
-                return redirect(url_for('import_csv'))
-            
-            created_count = 0
-            for row in reader:
-                if row.get('email') and Person.query.filter_by(email=row.get('email')).first():
-                    continue
-                person = Person(
-                    first_name=row['first_name'],
-                    last_name=row['last_name'],
-                    email=row.get('email', f"{row['first_name'].lower()}.{row['last_name'].lower()}@company.com"),
-                    department=row['department']
-                )
-                db.session.add(person)
-                db.session.flush()
-                log_action('create', 'Person', person.id, current_user.id, f'Imported person: {person.first_name} {person.last_name}')
-                created_count += 1
-            db.session.commit()
-            flash(f'Successfully imported {created_count} person(s)', 'success')
-            return redirect(url_for('index'))
+            importer(open_upload(file), current_user.id, current_app.config['IMPORT_CHUNK_SIZE'], result)
+        except CsvImportError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('main.import_csv'))
         except Exception as e:
-            flash(f'Error importing CSV: {str(e)}', 'error')
-    return render_template('import_csv.html')
+            db.session.rollback()
+            noun = 'item(s)' if kind == 'items' else 'person(s)'
+            # Each chunk commits on its own, so earlier chunks are already saved
+            flash(f'Error importing CSV: {str(e)}. {result.created} {noun} from earlier rows were imported.', 'error')
+            return render_template('import_csv.html', kind=kind)
+        noun = 'item(s)' if kind == 'items' else 'person(s)'
+        flash(f'Successfully imported {result.created} {noun}', 'success')
+        if result.rows:
+            return render_template('import_csv.html', kind=kind, result=result)
+        return redirect(url_for('main.assets' if kind == 'items' else 'main.index'))
+    return render_template('import_csv.html', kind=request.args.get('kind', 'people'))
 
-@app.route('/export-csv')
+@bp.route('/export')
 @admin_required
-def export_csv():
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['first_name', 'last_name', 'email', 'department'])
-    for person in Person.query.all():
-        writer.writerow([person.first_name, person.last_name, person.email or '', person.department])
-    output.seek(0)
-    log_action('export', 'Person', 0, current_user.id, 'Exported all persons to CSV')
+def export():
+    departments = [d for (d,) in db.session.query(Person.department).distinct().order_by(Person.department)]
+    statuses = [s for (s,) in db.session.query(InventoryItem.status).distinct().order_by(InventoryItem.status)]
+    return render_template('export.html', departments=departments, statuses=statuses)
+
+@bp.route('/export/<dataset>')
+@admin_required
+def export_data(dataset):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    filters = {key: request.args.get(key, '').strip() for key in ('department', 'status', 'date_from', 'date_to')}
+    try:
+        stmt, key_column = build_export(dataset, filters)
+    except ExportError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('main.export'))
+    spec = EXPORT_DATASETS[dataset]
+    applied = ', '.join(f'{k}={v}' for k, v in filters.items() if v)
+    log_action('export', spec['model_type'], 0, current_user.id,
+               f'Exported {dataset} to {fmt.upper()}' + (f' ({applied})' if applied else ''))
+    db.session.commit()
+    rows = generate_export(stmt, key_column, spec['include_key'], fmt, current_app.config['EXPORT_CHUNK_SIZE'])
     return Response(
-        output,
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename=persons.csv'}
+        stream_with_context(rows),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f"attachment; filename={spec['filename']}.{fmt}"}
     )
 
-@app.route('/add-item', methods=['GET', 'POST'])
+@bp.route('/export-csv')
+@admin_required
+def export_csv():
+    return export_data('people')
+
+@bp.route('/add-item', methods=['GET', 'POST'])
 @admin_required
 def add_item():
     person_id = request.args.get('person_id')
@@ -276,13 +514,16 @@ def add_item():
         assigned_to_id = request.form.get('assigned_to') if not is_stock else None
         if not all([item_type, serial_number]):
             flash('Item Type and Serial Number are required.', 'error')
-            return redirect(url_for('add_item', person_id=person_id))
+            return redirect(url_for('main.add_item', person_id=person_id))
         if InventoryItem.query.filter_by(serial_number=serial_number).first():
             flash('Serial number already exists.', 'error')
-            return redirect(url_for('add_item', person_id=person_id))
+            return redirect(url_for('main.add_item', person_id=person_id))
         if not is_stock and not assigned_to_id:
             flash('Assigned To is required unless adding to stock.', 'error')
-            return redirect(url_for('add_item', person_id=person_id))
+            return redirect(url_for('main.add_item', person_id=person_id))
+        if assigned_to_id and not db.session.get(Person, assigned_to_id):
+            flash('Selected employee does not exist.', 'error')
+            return redirect(url_for('main.add_item', person_id=person_id))
         item = InventoryItem(
             item_type=item_type,
             serial_number=serial_number,
@@ -296,13 +537,12 @@ def add_item():
         db.session.commit()
         flash('Item added successfully', 'success')
         if assigned_to_id:
-            return redirect(url_for('person_detail', id=assigned_to_id))
+            return redirect(url_for('main.person_detail', id=assigned_to_id))
         else:
-            return redirect(url_for('assets'))
-    people = Person.query.all()
-    return render_template('add_item.html', people=people, pre_assigned_person=pre_assigned_person)
+            return redirect(url_for('main.assets'))
+    return render_template('add_item.html', pre_assigned_person=pre_assigned_person)
 
-@app.route('/add-person', methods=['GET', 'POST'])
+@bp.route('/add-person', methods=['GET', 'POST'])
 @admin_required
 def add_person():
     if request.method == 'POST':
@@ -312,10 +552,10 @@ def add_person():
         department = request.form.get('department', '').strip()
         if not all([first_name, last_name, email, department]):
             flash('All fields (First Name, Last Name, Email, Department) are required.', 'error')
-            return redirect(url_for('add_person'))
+            return redirect(url_for('main.add_person'))
         if Person.query.filter_by(email=email).first():
             flash('Email already exists.', 'error')
-            return redirect(url_for('add_person'))
+            return redirect(url_for('main.add_person'))
         person = Person(
             first_name=first_name,
             last_name=last_name,
@@ -327,10 +567,10 @@ def add_person():
         log_action('create', 'Person', person.id, current_user.id, f'Added person: {first_name} {last_name}')
         db.session.commit()
         flash('Employee added successfully.', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('add_person.html')
 
-@app.route('/edit-person/<int:id>', methods=['GET', 'POST'])
+@bp.route('/edit-person/<int:id>', methods=['GET', 'POST'])
 @admin_required
 def edit_person(id):
     person = Person.query.get_or_404(id)
@@ -341,10 +581,10 @@ def edit_person(id):
         department = request.form.get('department', '').strip()
         if not all([first_name, last_name, email, department]):
             flash('All fields (First Name, Last Name, Email, Department) are required.', 'error')
-            return redirect(url_for('edit_person', id=id))
+            return redirect(url_for('main.edit_person', id=id))
         if Person.query.filter(Person.email == email, Person.id != id).first():
             flash('Email already exists.', 'error')
-            return redirect(url_for('edit_person', id=id))
+            return redirect(url_for('main.edit_person', id=id))
         person.first_name = first_name
         person.last_name = last_name
         person.email = email
@@ -353,10 +593,10 @@ def edit_person(id):
         log_action('update', 'Person', person.id, current_user.id, f'Updated person: {first_name} {last_name}')
         db.session.commit()
         flash('Employee updated successfully.', 'success')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('edit_person.html', person=person)
 
-@app.route('/edit-item/<int:id>', methods=['GET', 'POST'])
+@bp.route('/edit-item/<int:id>', methods=['GET', 'POST'])
 @admin_required
 def edit_item(id):
     item = InventoryItem.query.get_or_404(id)
@@ -368,13 +608,16 @@ def edit_item(id):
         assigned_to_id = request.form.get('assigned_to') if not is_stock else None
         if not all([item_type, serial_number]):
             flash('Item Type and Serial Number are required.', 'error')
-            return redirect(url_for('edit_item', id=id))
+            return redirect(url_for('main.edit_item', id=id))
         if InventoryItem.query.filter(InventoryItem.serial_number == serial_number, InventoryItem.id != id).first():
             flash('Serial number already exists', 'error')
-            return redirect(url_for('edit_item', id=id))
+            return redirect(url_for('main.edit_item', id=id))
         if not is_stock and not assigned_to_id:
             flash('Assigned To is required unless setting to stock.', 'error')
-            return redirect(url_for('edit_item', id=id))
+            return redirect(url_for('main.edit_item', id=id))
+        if assigned_to_id and not db.session.get(Person, assigned_to_id):
+            flash('Selected employee does not exist.', 'error')
+            return redirect(url_for('main.edit_item', id=id))
         item.item_type = item_type
         item.serial_number = serial_number
         item.details = details
@@ -385,13 +628,12 @@ def edit_item(id):
         db.session.commit()
         flash('Item updated successfully', 'success')
         if assigned_to_id:
-            return redirect(url_for('person_detail', id=assigned_to_id))
+            return redirect(url_for('main.person_detail', id=assigned_to_id))
         else:
-            return redirect(url_for('assets'))
-    people = Person.query.all()
-    return render_template('edit_item.html', item=item, people=people)
+            return redirect(url_for('main.assets'))
+    return render_template('edit_item.html', item=item)
 
-@app.route('/delete-item/<int:id>', methods=['POST'])
+@bp.route('/delete-item/<int:id>', methods=['POST'])
 @admin_required
 def delete_item(id):
     item = InventoryItem.query.get_or_404(id)
@@ -401,22 +643,144 @@ def delete_item(id):
     db.session.commit()
     flash('Item deleted successfully', 'success')
     if assigned_to_id:
-        return redirect(url_for('person_detail', id=assigned_to_id))
+        return redirect(url_for('main.person_detail', id=assigned_to_id))
     else:
-        return redirect(url_for('assets'))
+        return redirect(url_for('main.assets'))
 
-@app.route('/delete-person/<int:id>', methods=['POST'])
+@bp.route('/delete-person/<int:id>', methods=['POST'])
 @admin_required
 def delete_person(id):
     person = Person.query.get_or_404(id)
     if InventoryItem.query.filter_by(assigned_to_id=id).first():
         flash('Cannot delete employee with assigned items', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     log_action('delete', 'Person', person.id, current_user.id, f'Deleted person: {person.first_name} {person.last_name}')
     db.session.delete(person)
     db.session.commit()
     flash('Employee deleted successfully', 'success')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
+
+@bp.route('/admin/stats')
+@admin_required
+def performance_stats():
+    enabled = 'instrumentation' in current_app.extensions
+    snapshot = instrumentation.stats.snapshot() if enabled else {'endpoints': [], 'slowest': []}
+    audit_writer = current_app.extensions.get('audit_writer')
+    hash_pool = current_app.extensions.get('password_hasher')
+    return render_template(
+        'stats.html',
+        enabled=enabled,
+        stats=snapshot,
+        slow_query_ms=current_app.config['SLOW_QUERY_MS'],
+        audit_mode=current_app.config['AUDIT_MODE'],
+        audit_metrics=audit_writer.metrics() if audit_writer else None,
+        hash_metrics=hash_pool.metrics() if hash_pool else None,
+    )
+
+@bp.route('/audit')
+@admin_required
+def audit_log():
+    filters = {key: request.args.get(key, '').strip() for key in ('user_id', 'action', 'model_type', 'model_id', 'date_from', 'date_to')}
+    query = AuditLog.query.options(joinedload(AuditLog.user))
+    try:
+        if filters['user_id']:
+            query = query.filter(AuditLog.user_id == int(filters['user_id']))
+        if filters['action']:
+            query = query.filter(AuditLog.action == filters['action'])
+        if filters['model_type']:
+            query = query.filter(AuditLog.model_type == filters['model_type'])
+        if filters['model_id']:
+            query = query.filter(AuditLog.model_id == int(filters['model_id']))
+        if filters['date_from']:
+            query = query.filter(AuditLog.timestamp >= datetime.strptime(filters['date_from'], '%Y-%m-%d'))
+        if filters['date_to']:
+            query = query.filter(AuditLog.timestamp < datetime.strptime(filters['date_to'], '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        flash('Invalid filter value.', 'error')
+        return redirect(url_for('main.audit_log'))
+    # No total count: the audit table is the largest in the database and changes on every request
+    page = paginate(
+        query,
+        sortable={'timestamp': (AuditLog.timestamp,)},
+        default_sort='timestamp',
+        default_direction='desc',
+        id_column=AuditLog.id,
+        count_key=None,
+        count_tables=('audit_log',),
+        extra_args=filters,
+    )
+    users = User.query.order_by(User.username).all()
+    return render_template('audit_log.html', entries=page.items, page=page, filters=filters, users=users, actions=AUDIT_ACTIONS, model_types=AUDIT_MODEL_TYPES)
+
+@bp.cli.command('archive-audit')
+@click.option('--days', type=int, default=None, help='Archive rows older than this many days (default AUDIT_RETENTION_DAYS).')
+@click.option('--directory', default=None, help='Archive directory (default AUDIT_ARCHIVE_DIR).')
+def archive_audit(days, directory):
+    days = days if days is not None else current_app.config['AUDIT_RETENTION_DAYS']
+    directory = directory or current_app.config['AUDIT_ARCHIVE_DIR']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = archive_older_than(db, cutoff, directory)
+    print(f'Archived {archived} audit rows older than {cutoff:%Y-%m-%d} to {directory}')
+
+@bp.cli.command('reconcile-stats')
+def reconcile_stats():
+    counters.install_triggers(db.engine)
+    values = counters.reconcile()
+    print(f"Dashboard counters reconciled: {values[('people', '')]} people, {values[('items', '')]} items")
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index():
+    install_index(db.engine)
+    people, items = rebuild_index(db.engine)
+    print(f'Search index rebuilt: {people} people, {items} items')
+
+@bp.cli.command('backfill-assignments')
+@click.option('--force', is_flag=True, help='Replace assignment history that already exists.')
+def backfill_assignments(force):
+    history.install_triggers(db.engine)
+    if not force and db.session.query(ItemAssignment.id).first() is not None:
+        print('Assignment history already exists; pass --force to rebuild it from the audit log')
+        return
+    summary = history.backfill(db.engine)
+    print(f"Assignment history rebuilt: {summary['assignments']} assignments for {summary['items']} items, "
+          f"{summary['unattributed']} stretches without a known holder skipped")
+
+@bp.route('/healthz')
+def healthz():
+    # Liveness: the process is up and serving requests
+    return jsonify(status='ok')
+
+@bp.route('/readyz')
+def readyz():
+    # Readiness: every database bind answers a trivial query
+    checks = {}
+    for key, engine in db.engines.items():
+        try:
+            with engine.connect() as conn:
+                conn.execute(db.text('SELECT 1'))
+            checks[key or 'default'] = 'ok'
+        except Exception as e:
+            checks[key or 'default'] = f'error: {e}'
+    ready = all(value == 'ok' for value in checks.values())
+    return jsonify(status='ok' if ready else 'unavailable', checks=checks), 200 if ready else 503
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+    if not app.config.get('AUDIT_ARCHIVE_DIR'):
+        app.config['AUDIT_ARCHIVE_DIR'] = os.path.join(app.instance_path, 'audit_archive')
+
+    database.configure(app)
+    db.init_app(app)
+    database.init_app(app, db)
+    instrumentation.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(bp)
+    return app
 
 if __name__ == '__main__':
     local_ip = socket.gethostbyname(socket.gethostname())
@@ -424,4 +788,5 @@ if __name__ == '__main__':
     print("Database should already exist. If not, run 'python create_database.py' first.")
     print("Login: admin / admin123")
     print(f"URL: http://{local_ip}:9000")
-    app.run(host='0.0.0.0', port=9000, debug=True)
\ No newline at end of file
+    print("For production use: gunicorn -c gunicorn.conf.py wsgi:app")
+    create_app().run(host='0.0.0.0', port=9000, debug=True)
\ No newline at end of file
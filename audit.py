@@ -0,0 +1,214 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from cache import bump_table_version
+from models import db, AuditLog
+from per_process import PerProcess
+
+# Audit modes:
+#   async       - rows wait in the caller's session until it commits, then go
+#                 on an in-process queue and a background thread writes them
+#                 in batches, one transaction per AUDIT_BATCH_SIZE rows or
+#                 AUDIT_FLUSH_INTERVAL_MS, whichever comes first. A rollback
+#                 drops them, so a failed change leaves no audit row.
+#   transaction - rows are added to the caller's session and commit (or roll
+#                 back) with the caller's own changes
+#   sync        - rows are committed immediately, one transaction per event
+MODES = ('async', 'transaction', 'sync')
+
+logger = logging.getLogger('equipment_tracking.audit')
+
+_STOP = object()
+
+
+class AuditWriter:
+    def __init__(self, engine, batch_size=100, flush_interval=0.25, max_queue=10000, put_timeout=1.0):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = PerProcess(self._start_thread, alive=lambda thread: thread.is_alive())
+        self._metrics_lock = threading.Lock()
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+        self.overflow = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def _start_thread(self):
+        thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        thread.start()
+        return thread
+
+    def _ensure_started(self):
+        self._thread.get()
+
+    def submit(self, row):
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            # Never drop audit rows: when the writer can't keep up, write inline
+            with self._metrics_lock:
+                self.overflow += 1
+            self._write([row])
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if row is _STOP:
+                self._queue.task_done()
+                return
+            batch = [row]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+            self._write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        started = time.perf_counter()
+        for attempt in range(3):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(AuditLog.__table__.insert(), batch)
+                break
+            except Exception:
+                if attempt == 2:
+                    logger.exception('Dropping %d audit rows after repeated write failures', len(batch))
+                    with self._metrics_lock:
+                        self.failed += len(batch)
+                    return
+                time.sleep(0.05 * (attempt + 1))
+        elapsed = (time.perf_counter() - started) * 1000
+        bump_table_version('audit_log')
+        with self._metrics_lock:
+            self.batches += 1
+            self.written += len(batch)
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self._total_flush_ms += elapsed
+
+    def flush(self):
+        """Block until every queued row has been written."""
+        thread = self._thread.current()
+        if thread is not None and thread.is_alive():
+            self._queue.join()
+
+    def stop(self):
+        thread = self._thread.current()
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout=10)
+        # Anything left (writer never started, or timed out) is written inline
+        leftover = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not _STOP:
+                leftover.append(row)
+        if leftover:
+            self._write(leftover)
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'written': self.written,
+                'failed': self.failed,
+                'overflow': self.overflow,
+                'last_flush_ms': round(self.last_flush_ms, 2),
+                'max_flush_ms': round(self.max_flush_ms, 2),
+                'avg_flush_ms': round(self._total_flush_ms / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+def get_writer(app=None):
+    app = app or current_app
+    writer = app.extensions.get('audit_writer')
+    if writer is None:
+        with app.app_context():
+            engine = db.engine
+        writer = AuditWriter(
+            engine,
+            batch_size=app.config.get('AUDIT_BATCH_SIZE', 100),
+            flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL_MS', 250) / 1000.0,
+            max_queue=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+        )
+        writer = app.extensions.setdefault('audit_writer', writer)
+        atexit.register(writer.stop)
+    return writer
+
+
+def record(action, model_type, model_id, user_id, details=None):
+    mode = current_app.config.get('AUDIT_MODE', 'async')
+    if mode == 'async':
+        db.session.info.setdefault('pending_audit', []).append((get_writer(), {
+            'action': action,
+            'model_type': model_type,
+            'model_id': model_id,
+            'user_id': user_id,
+            'details': details,
+            # Stamped at enqueue time so ordering reflects when the event happened
+            'timestamp': datetime.utcnow(),
+        }))
+        return
+    db.session.add(AuditLog(
+        action=action,
+        model_type=model_type,
+        model_id=model_id,
+        user_id=user_id,
+        details=details
+    ))
+    if mode == 'sync':
+        db.session.commit()
+
+
+@event.listens_for(Session, 'after_commit')
+def _commit_pending(session):
+    pending = session.info.pop('pending_audit', None)
+    if pending:
+        session.info.setdefault('committed_audit', []).extend(pending)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _submit_committed(session, transaction):
+    # Submitted only once the transaction has given its connection back: when
+    # the queue is full submit() writes inline, which needs a connection from
+    # the same pool (a single one with the read pool)
+    if transaction.parent is None:
+        for writer, row in session.info.pop('committed_audit', ()):
+            writer.submit(row)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('pending_audit', None)
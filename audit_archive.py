@@ -0,0 +1,125 @@
+"""Move old audit rows into monthly gzip NDJSON archives and search them offline.
+
+Archiving runs through ``flask archive-audit``. Searching needs only this file
+and the archive directory:
+
+    python audit_archive.py instance/audit_archive --user admin --action delete --from 2024-01-01
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+
+def archive_path(directory, month):
+    return os.path.join(directory, f'audit-{month}.ndjson.gz')
+
+
+def archive_older_than(db, cutoff, directory, chunk_size=5000):
+    """Append rows older than ``cutoff`` to per-month archives, then delete them.
+
+    Each chunk is fsynced to its archive files before the rows are deleted, so
+    a crash can at worst leave a row both archived and in the table (search
+    de-duplicates on id), never lost. Returns the number of rows archived.
+    """
+    from cache import mark_touched
+    from models import AuditLog, User
+
+    os.makedirs(directory, exist_ok=True)
+    archived = 0
+    while True:
+        rows = (
+            db.session.query(AuditLog.id, AuditLog.timestamp, AuditLog.user_id, User.username,
+                             AuditLog.action, AuditLog.model_type, AuditLog.model_id, AuditLog.details)
+            .outerjoin(User, AuditLog.user_id == User.id)
+            .filter(AuditLog.timestamp < cutoff)
+            .order_by(AuditLog.timestamp, AuditLog.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            break
+        by_month = {}
+        for row in rows:
+            record = row._asdict()
+            record['timestamp'] = row.timestamp.isoformat()
+            by_month.setdefault(row.timestamp.strftime('%Y-%m'), []).append(record)
+        for month, records in by_month.items():
+            # Appending adds a new gzip member; gzip readers treat the file as one stream
+            with open(archive_path(directory, month), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                    for record in records:
+                        archive.write((json.dumps(record) + '\n').encode('utf8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+        db.session.query(AuditLog).filter(AuditLog.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+        mark_touched(db.session, 'audit_log')
+        db.session.commit()
+        archived += len(rows)
+    return archived
+
+
+def _month_in_range(month, date_from, date_to):
+    start = datetime.strptime(month, '%Y-%m')
+    end = (start + timedelta(days=32)).replace(day=1)
+    return (date_from is None or end > date_from) and (date_to is None or start < date_to)
+
+
+def search_archives(directory, user=None, action=None, model_type=None, model_id=None,
+                    date_from=None, date_to=None, text=None):
+    """Yield archived rows matching every given filter, oldest month first."""
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(directory, 'audit-*.ndjson.gz'))):
+        month = os.path.basename(path)[len('audit-'):-len('.ndjson.gz')]
+        # Whole months outside the date range are skipped without opening them
+        if not _month_in_range(month, date_from, date_to):
+            continue
+        with gzip.open(path, 'rt', encoding='utf8') as archive:
+            for line in archive:
+                record = json.loads(line)
+                if record['id'] in seen:
+                    continue
+                timestamp = datetime.fromisoformat(record['timestamp'])
+                if date_from and timestamp < date_from:
+                    continue
+                if date_to and timestamp >= date_to:
+                    continue
+                if user and user not in (record.get('username'), str(record.get('user_id'))):
+                    continue
+                if action and record['action'] != action:
+                    continue
+                if model_type and record['model_type'] != model_type:
+                    continue
+                if model_id is not None and record['model_id'] != model_id:
+                    continue
+                if text and text.lower() not in (record.get('details') or '').lower():
+                    continue
+                seen.add(record['id'])
+                yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search archived audit log files.')
+    parser.add_argument('directory')
+    parser.add_argument('--user', help='username or user id')
+    parser.add_argument('--action')
+    parser.add_argument('--model-type')
+    parser.add_argument('--model-id', type=int)
+    parser.add_argument('--from', dest='date_from', help='YYYY-MM-DD, inclusive')
+    parser.add_argument('--to', dest='date_to', help='YYYY-MM-DD, inclusive')
+    parser.add_argument('--text', help='substring of the details column')
+    args = parser.parse_args(argv)
+
+    date_from = datetime.strptime(args.date_from, '%Y-%m-%d') if args.date_from else None
+    date_to = datetime.strptime(args.date_to, '%Y-%m-%d') + timedelta(days=1) if args.date_to else None
+    for record in search_archives(args.directory, args.user, args.action, args.model_type,
+                                  args.model_id, date_from, date_to, args.text):
+        sys.stdout.write(json.dumps(record) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+from datetime import datetime
+
+from cache import mark_touched
+from database import in_chunks
+from models import db, Person, InventoryItem, AuditLog
+
+# Batched item changes for POST /api/items/bulk. A batch is validated against
+# one SELECT of the items involved, applied with a single set-based UPDATE and
+# one multi-row INSERT of audit entries, and committed as one transaction.
+#
+#   {"operation": "assign",   "serials": [...], "person_id": 7}
+#   {"operation": "unassign", "serials": [...]}            return to stock
+#   {"operation": "unassign", "person_id": 7}              return all of 7's items
+#   {"operation": "transfer", "from_person_id": 7, "to_person_id": 9, "serials": [...]}
+#                                                          serials optional: all of 7's items
+#   {"operation": "status",   "serials": [...], "status": "repair"}
+#
+# 'stock' as a status also clears the assignment, and 'active' is only valid
+# for assigned items, matching what the item forms allow. With
+# "atomic": true any per-item error rejects the whole batch; otherwise the
+# valid items are applied and the rest reported.
+
+OPERATIONS = ('assign', 'unassign', 'transfer', 'status')
+
+
+class BulkOperationError(ValueError):
+    pass
+
+
+class BulkResult:
+    def __init__(self, operation):
+        self.operation = operation
+        self.results = []
+        self.applied = False
+
+    def add(self, serial_number, status, item_id=None, message=None):
+        self.results.append({'serial_number': serial_number, 'id': item_id, 'status': status, 'message': message})
+
+    def count(self, status):
+        return sum(1 for r in self.results if r['status'] == status)
+
+    def as_dict(self):
+        return {
+            'operation': self.operation,
+            'applied': self.applied,
+            'updated': self.count('updated'),
+            'unchanged': self.count('unchanged'),
+            'errors': self.count('error') + self.count('not_found'),
+            'results': self.results,
+        }
+
+
+def _person(payload, field, required=True):
+    value = payload.get(field)
+    if value is None:
+        if required:
+            raise BulkOperationError(f'{field} is required')
+        return None
+    try:
+        person = db.session.get(Person, int(value))
+    except (TypeError, ValueError):
+        raise BulkOperationError(f'{field} must be an integer')
+    if person is None:
+        raise BulkOperationError(f'No employee with id {value}')
+    return person
+
+
+def _serials(payload, max_items, required=True):
+    serials = payload.get('serials')
+    if serials is None and not required:
+        return None
+    if not isinstance(serials, list) or not serials:
+        raise BulkOperationError('serials must be a non-empty list')
+    cleaned = []
+    for serial in serials:
+        if not isinstance(serial, str) or not serial.strip():
+            raise BulkOperationError('serials must be non-empty strings')
+        cleaned.append(serial.strip())
+    cleaned = list(dict.fromkeys(cleaned))
+    if len(cleaned) > max_items:
+        raise BulkOperationError(f'At most {max_items} items per batch')
+    return cleaned
+
+
+def _load_items(serials=None, person_id=None):
+    columns = (InventoryItem.id, InventoryItem.serial_number, InventoryItem.item_type,
+               InventoryItem.status, InventoryItem.assigned_to_id)
+    if serials is None:
+        return list(db.session.query(*columns).filter(InventoryItem.assigned_to_id == person_id)
+                    .order_by(InventoryItem.id))
+    rows = []
+    for chunk in in_chunks(serials):
+        rows.extend(db.session.query(*columns).filter(InventoryItem.serial_number.in_(chunk)))
+    by_serial = {row.serial_number: row for row in rows}
+    return [by_serial.get(serial, serial) for serial in serials]
+
+
+def _name(person):
+    return f'{person.first_name} {person.last_name}'
+
+
+def _plan(operation, payload, max_items):
+    """Return (items, changes, describe, check) for an operation.
+
+    ``check(row)`` returns None to update the item, 'unchanged', or an error
+    message; ``describe(row)`` builds the audit details.
+    """
+    if operation == 'assign':
+        person = _person(payload, 'person_id')
+        items = _load_items(_serials(payload, max_items))
+        changes = {'assigned_to_id': person.id, 'status': 'active'}
+
+        def check(row):
+            if row.assigned_to_id == person.id and row.status == 'active':
+                return 'unchanged'
+            if row.assigned_to_id is not None:
+                return f'Assigned to employee {row.assigned_to_id}; use transfer'
+            return None
+
+        return items, changes, lambda row: f'Bulk assign: {row.item_type} ({row.serial_number}) to {_name(person)}', check
+
+    if operation == 'unassign':
+        person = _person(payload, 'person_id', required=False)
+        serials = _serials(payload, max_items, required=person is None)
+        items = _load_items(serials) if serials is not None else _load_items(person_id=person.id)
+        changes = {'assigned_to_id': None, 'status': 'stock'}
+
+        def check(row):
+            if person is not None and row.assigned_to_id != person.id:
+                return f'Not assigned to employee {person.id}'
+            if row.assigned_to_id is None and row.status == 'stock':
+                return 'unchanged'
+            return None
+
+        return items, changes, lambda row: f'Bulk return to stock: {row.item_type} ({row.serial_number})', check
+
+    if operation == 'transfer':
+        source = _person(payload, 'from_person_id')
+        target = _person(payload, 'to_person_id')
+        if source.id == target.id:
+            raise BulkOperationError('from_person_id and to_person_id must differ')
+        serials = _serials(payload, max_items, required=False)
+        items = _load_items(serials) if serials is not None else _load_items(person_id=source.id)
+        changes = {'assigned_to_id': target.id}
+
+        def check(row):
+            if row.assigned_to_id != source.id:
+                return f'Not assigned to employee {source.id}'
+            return None
+
+        return items, changes, lambda row: (
+            f'Bulk transfer: {row.item_type} ({row.serial_number}) from {_name(source)} to {_name(target)}'), check
+
+    status = payload.get('status')
+    status = status.strip() if isinstance(status, str) else ''
+    if not status or len(status) > 50:
+        raise BulkOperationError('status must be a non-empty string of at most 50 characters')
+    items = _load_items(_serials(payload, max_items))
+    changes = {'status': status}
+    if status == 'stock':
+        changes['assigned_to_id'] = None
+
+    def check(row):
+        if row.status == status and (status != 'stock' or row.assigned_to_id is None):
+            return 'unchanged'
+        if status == 'active' and row.assigned_to_id is None:
+            return 'Only assigned items can be active; use assign'
+        return None
+
+    return items, changes, lambda row: f'Bulk status: {row.item_type} ({row.serial_number}) {row.status} -> {status}', check
+
+
+def run(payload, user_id, max_items=1000):
+    if not isinstance(payload, dict):
+        raise BulkOperationError('Expected a JSON object')
+    operation = payload.get('operation')
+    if operation not in OPERATIONS:
+        raise BulkOperationError(f"operation must be one of: {', '.join(OPERATIONS)}")
+    atomic = payload.get('atomic', False)
+    if not isinstance(atomic, bool):
+        raise BulkOperationError('atomic must be true or false')
+
+    items, changes, describe, check = _plan(operation, payload, max_items)
+    result = BulkResult(operation)
+    to_update = []
+    for row in items:
+        if isinstance(row, str):
+            result.add(row, 'not_found', message='No item with this serial number')
+            continue
+        problem = check(row)
+        if problem == 'unchanged':
+            result.add(row.serial_number, 'unchanged', row.id)
+        elif problem:
+            result.add(row.serial_number, 'error', row.id, problem)
+        else:
+            result.add(row.serial_number, 'updated', row.id)
+            to_update.append(row)
+
+    if atomic and result.count('error') + result.count('not_found'):
+        for entry in result.results:
+            if entry['status'] == 'updated':
+                entry.update(status='skipped', message='Batch rejected because of errors in other items')
+        db.session.rollback()
+        return result
+    if to_update:
+        now = datetime.utcnow()
+        for chunk in in_chunks(row.id for row in to_update):
+            (InventoryItem.query.filter(InventoryItem.id.in_(chunk))
+             .update(dict(changes, updated_at=now), synchronize_session=False))
+        db.session.bulk_insert_mappings(AuditLog, [{
+            'action': 'update',
+            'model_type': 'InventoryItem',
+            'model_id': row.id,
+            'user_id': user_id,
+            'details': describe(row)[:255],
+            'timestamp': now,
+        } for row in to_update])
+        mark_touched(db.session, 'inventory_item', 'audit_log')
+    db.session.commit()
+    result.applied = True
+    return result
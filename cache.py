@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded in-process cache with per-entry expiry and LRU eviction."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, factory, ttl=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Per-table write counters, bumped after every commit that touched the table.
+# Cache keys that embed table_version() are invalidated by any committed write.
+_table_versions = {}
+_versions_lock = threading.Lock()
+
+
+def table_version(*tables):
+    with _versions_lock:
+        return tuple(_table_versions.get(t, 0) for t in tables)
+
+
+def bump_table_version(*tables):
+    with _versions_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def mark_touched(session, *tables):
+    """Bump ``tables`` when ``session`` next commits.
+
+    Flushes record the tables of the objects they write, but bulk inserts and
+    set-based UPDATE/DELETE statements bypass the unit of work, so code that
+    uses them names the tables here.
+    """
+    session.info.setdefault('touched_tables', set()).update(tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_touched_tables(session, flush_context):
+    touched = session.info.setdefault('touched_tables', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            touched.add(table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_touched_tables(session):
+    touched = session.info.pop('touched_tables', None)
+    if touched:
+        bump_table_version(*touched)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_touched_tables(session):
+    session.info.pop('touched_tables', None)
@@ -0,0 +1,135 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+
+import counters
+from models import db, Person, InventoryItem, StatCounter
+
+# Validators for conditional GET on the list and detail pages.
+#
+# A page's ETag is a hash of a few cheap facts about the rows it shows: the
+# newest updated_at (indexed, so max() is a single b-tree seek), the row count
+# and the number of deletions (both kept in stat_counter by the triggers in
+# counters.py), plus the viewer's id and role and the full URL. Last-Modified
+# is the newer of that updated_at and the last deletion. Browsers get
+# "Cache-Control: private, no-cache", so they revalidate on every visit and a
+# matching If-None-Match / If-Modified-Since is answered with 304 before any
+# of the page's own queries or template rendering run.
+
+# Changes on every deploy or restart, so new templates never hide behind an
+# old ETag. With gunicorn's preload_app all workers share the same value.
+_STARTED = int(time.time())
+
+TABLES = {
+    'person': (Person, 'people'),
+    'inventory_item': (InventoryItem, 'items'),
+}
+
+
+def _counter(scope, key):
+    return (select(StatCounter.value)
+            .where(StatCounter.scope == scope, StatCounter.key == key)
+            .scalar_subquery())
+
+
+def _utc(value):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return datetime.fromtimestamp(value, timezone.utc)
+    return value.replace(microsecond=0, tzinfo=timezone.utc)
+
+
+class Validator:
+    def __init__(self, parts, last_modified):
+        # The data-only part of the validator, usable as a cache key across users
+        self.state = tuple(parts)
+        parts = (_STARTED, current_user.get_id(), current_user.role, request.full_path) + tuple(parts)
+        self.etag = hashlib.sha1(repr(parts).encode('utf8')).hexdigest()[:24]
+        self.last_modified = last_modified
+
+    def is_fresh(self):
+        # If-None-Match wins when both are sent (RFC 9110 13.2.2)
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+        if request.if_modified_since and self.last_modified:
+            return self.last_modified <= request.if_modified_since
+        return False
+
+    def apply(self, response):
+        if response.status_code in (200, 304):
+            response.set_etag(self.etag, weak=True)
+            if self.last_modified:
+                response.last_modified = self.last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+        return response
+
+    def not_modified(self):
+        return self.apply(current_app.response_class(status=304))
+
+
+def _enabled():
+    # A pending flash message belongs in the next full render, so never answer 304 over it
+    return (request.method in ('GET', 'HEAD') and current_app.config.get('CONDITIONAL_GET', True)
+            and not session.get('_flashes'))
+
+
+def for_tables(*tables):
+    """Validator for a page listing rows from ``tables``; None when conditional GET doesn't apply."""
+    if not _enabled():
+        return None
+    return Validator(*table_state(*tables))
+
+
+def table_state(*tables):
+    """(parts, last_modified) describing the current contents of ``tables``, from one small SELECT."""
+    columns = []
+    for table in tables:
+        model, total_scope = TABLES[table]
+        columns += [
+            select(func.max(model.updated_at)).scalar_subquery(),
+            _counter(total_scope, ''),
+            _counter('deleted', table),
+            _counter('deleted_at', table),
+        ]
+    row = db.session.execute(select(*columns)).one()
+    parts, stamps = [], []
+    for n, table in enumerate(tables):
+        updated_at, stored_total, deleted, deleted_at = row[n * 4:n * 4 + 4]
+        parts.append((table, updated_at, counters.total(TABLES[table][1], stored_total), deleted))
+        stamps += [_utc(updated_at), _utc(deleted_at)]
+    stamps = [stamp for stamp in stamps if stamp is not None]
+    return tuple(parts), max(stamps) if stamps else None
+
+
+def for_person(person_id):
+    """Validator for a person's detail page, covering the person and the items assigned to them."""
+    if not _enabled():
+        return None
+    # An item reassigned away drops out of this person's max(updated_at), so
+    # Last-Modified uses the newest change to any item; the ETag stays specific
+    row = db.session.execute(
+        select(Person.updated_at, func.max(InventoryItem.updated_at), func.count(InventoryItem.id),
+               select(func.max(InventoryItem.updated_at)).scalar_subquery(),
+               _counter('deleted_at', 'inventory_item'))
+        .outerjoin(InventoryItem, InventoryItem.assigned_to_id == Person.id)
+        .where(Person.id == person_id)
+        .group_by(Person.id)
+    ).first()
+    if row is None:
+        # Let the view produce its 404
+        return None
+    person_updated, items_updated, item_count, any_item_updated, deleted_at = row
+    stamps = [stamp for stamp in (_utc(person_updated), _utc(any_item_updated), _utc(deleted_at)) if stamp is not None]
+    return Validator((person_id, person_updated, items_updated, item_count), max(stamps))
+
+
+def respond(validator, rv):
+    response = make_response(rv)
+    return validator.apply(response) if validator is not None else response
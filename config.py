@@ -0,0 +1,46 @@
+import os
+
+# Shared by the app factory, create_database.py and the production server.
+# Values that differ between deployments can be set from the environment.
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-replace-this')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+    COUNT_CACHE_TTL = 60
+    SEARCH_TOKENIZER = 'trigram'
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED') == '1'
+    SLOW_QUERY_MS = 100
+    IMPORT_CHUNK_SIZE = 500
+    EXPORT_CHUNK_SIZE = 1000
+    AUDIT_MODE = os.environ.get('AUDIT_MODE', 'async')
+    AUDIT_BATCH_SIZE = 100
+    AUDIT_FLUSH_INTERVAL_MS = 250
+    AUDIT_QUEUE_SIZE = 10000
+    AUDIT_RETENTION_DAYS = 365
+    # None means <instance folder>/audit_archive
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR')
+    PEOPLE_LOOKUP_LIMIT = 10
+    PEOPLE_LOOKUP_TTL = 30
+    SEARCH_RESULTS_CACHE_TTL = 60
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE = 16
+    PASSWORD_HASH_TIMEOUT = 10
+    BULK_MAX_ITEMS = 1000
+    CONDITIONAL_GET = True
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_READ_POOL = os.environ.get('SQLITE_READ_POOL') == '1'
+    SQLITE_READ_POOL_SIZE = 8
+
+
+class ProductionConfig(Config):
+    SQLITE_READ_POOL = os.environ.get('SQLITE_READ_POOL', '1') == '1'
+    # Every worker process runs its own hashing pool
+    PASSWORD_HASH_WORKERS = 1
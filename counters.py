@@ -0,0 +1,149 @@
+from sqlalchemy import text
+
+from models import db, Person, InventoryItem, StatCounter
+
+# Dashboard counters kept in the stat_counter table. Triggers adjust them on
+# every insert, update and delete of people and items (including bulk imports
+# that bypass the ORM), so reading the dashboard is a single small SELECT no
+# matter how large the inventory grows. `flask reconcile-stats` recomputes
+# them from scratch if they ever drift.
+#
+# A database that never had them initialised (created before the triggers,
+# or without create_database.py) has no stat_counter rows; readers then count
+# directly, through total() or compute_counters(), and stay correct if slower.
+#
+# Scopes: people, items (key ''), people_department, items_department,
+# items_status, items_type, stock_type.
+#
+# The triggers also record deletions per table (scopes deleted and
+# deleted_at, keyed by table name) for the conditional GET validators in
+# conditional.py; those are tracking values, not totals, so reconcile keeps them.
+TRACKING_SCOPES = ('deleted', 'deleted_at')
+
+_TOTALS = {'people': Person, 'items': InventoryItem}
+
+
+def _bump(scope, key, delta, condition='1'):
+    return (
+        f"INSERT INTO stat_counter (scope, key, value) SELECT '{scope}', {key}, {delta} WHERE {condition} "
+        f"ON CONFLICT (scope, key) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+def _item_bumps(row, sign):
+    department = f"coalesce((SELECT department FROM person WHERE id = {row}.assigned_to_id), '')"
+    return '\n'.join([
+        _bump('items_status', f'{row}.status', sign),
+        _bump('items_type', f'{row}.item_type', sign),
+        _bump('items_department', department, sign, f'{row}.assigned_to_id IS NOT NULL'),
+        _bump('stock_type', f'{row}.item_type', sign, f"{row}.status = 'stock'"),
+    ])
+
+
+def _stamp(scope, key):
+    return (
+        f"INSERT INTO stat_counter (scope, key, value) VALUES ('{scope}', {key}, CAST(strftime('%s', 'now') AS INTEGER)) "
+        f"ON CONFLICT (scope, key) DO UPDATE SET value = excluded.value;"
+    )
+
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS stat_item_ai AFTER INSERT ON inventory_item BEGIN
+        {_bump('items', "''", 1)}
+        {_item_bumps('new', 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_item_ad AFTER DELETE ON inventory_item BEGIN
+        {_bump('items', "''", -1)}
+        {_item_bumps('old', -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_item_au
+    AFTER UPDATE OF item_type, status, assigned_to_id ON inventory_item BEGIN
+        {_item_bumps('old', -1)}
+        {_item_bumps('new', 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_person_ai AFTER INSERT ON person BEGIN
+        {_bump('people', "''", 1)}
+        {_bump('people_department', 'new.department', 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_person_ad AFTER DELETE ON person BEGIN
+        {_bump('people', "''", -1)}
+        {_bump('people_department', 'old.department', -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_person_au AFTER UPDATE OF department ON person
+    WHEN old.department IS NOT new.department BEGIN
+        {_bump('people_department', 'old.department', -1)}
+        {_bump('people_department', 'new.department', 1)}
+        {_bump('items_department', 'old.department', '-(SELECT count(*) FROM inventory_item WHERE assigned_to_id = old.id)')}
+        {_bump('items_department', 'new.department', '(SELECT count(*) FROM inventory_item WHERE assigned_to_id = new.id)')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_item_deleted AFTER DELETE ON inventory_item BEGIN
+        {_bump('deleted', "'inventory_item'", 1)}
+        {_stamp('deleted_at', "'inventory_item'")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stat_person_deleted AFTER DELETE ON person BEGIN
+        {_bump('deleted', "'person'", 1)}
+        {_stamp('deleted_at', "'person'")}
+    END""",
+]
+
+
+def install_triggers(engine):
+    """Create the counter triggers if missing; returns True if any were created."""
+    with engine.begin() as conn:
+        existing = {name for (name,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'stat_%'"
+        ))}
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+    return len(existing) < len(TRIGGERS)
+
+
+def total(scope, stored=None):
+    """The people or items total: ``stored`` if the counter exists, else a direct count."""
+    return stored if stored is not None else _TOTALS[scope].query.count()
+
+
+def compute_counters():
+    """Recompute every counter with GROUP BY queries; returns {(scope, key): value}."""
+    counters = {(scope, ''): total(scope) for scope in _TOTALS}
+    grouped = [
+        ('people_department', db.session.query(Person.department, db.func.count()).group_by(Person.department)),
+        ('items_status', db.session.query(InventoryItem.status, db.func.count()).group_by(InventoryItem.status)),
+        ('items_type', db.session.query(InventoryItem.item_type, db.func.count()).group_by(InventoryItem.item_type)),
+        ('items_department', db.session.query(Person.department, db.func.count(InventoryItem.id))
+            .join(Person, InventoryItem.assigned_to_id == Person.id).group_by(Person.department)),
+        ('stock_type', db.session.query(InventoryItem.item_type, db.func.count())
+            .filter(InventoryItem.status == 'stock').group_by(InventoryItem.item_type)),
+    ]
+    for scope, query in grouped:
+        for key, value in query:
+            counters[(scope, key)] = value
+    return counters
+
+
+def reconcile():
+    """Replace the stored counters with freshly computed ones in one transaction."""
+    counters = compute_counters()
+    db.session.query(StatCounter).filter(StatCounter.scope.notin_(TRACKING_SCOPES)).delete(synchronize_session=False)
+    db.session.bulk_insert_mappings(StatCounter, [
+        {'scope': scope, 'key': key, 'value': value} for (scope, key), value in counters.items()
+    ])
+    db.session.commit()
+    return counters
+
+
+def _load():
+    counters = {(c.scope, c.key): c.value for c in StatCounter.query.all()}
+    if ('people', '') not in counters:
+        counters = compute_counters()
+    summary = {'people': counters.get(('people', ''), 0), 'items': counters.get(('items', ''), 0)}
+    for scope in ('people_department', 'items_department', 'items_status', 'items_type', 'stock_type'):
+        rows = [(key, value) for (s, key), value in counters.items() if s == scope and value > 0]
+        summary[scope] = sorted(rows, key=lambda row: (-row[1], row[0]))
+    return summary
+
+
+def summary():
+    # Read straight from stat_counter on every call: it is one small SELECT, and
+    # an in-process cache would serve stale totals after writes in other workers
+    return _load()
@@ -1,22 +1,52 @@
-from flask import Flask
+from app import create_app
 from models import db, Person, InventoryItem, User, AuditLog
 from werkzeug.security import generate_password_hash
+from search import install_index, rebuild_index
+import counters
+import history
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///db.sqlite3'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db.init_app(app)
+def init_database(app):
+    """Create or upgrade the schema, search index and counters; safe to run repeatedly."""
+    with app.app_context():
+        db.create_all()
+        # Columns added after the first release (before the indexes that use them)
+        user_columns = {column['name'] for column in db.inspect(db.engine).get_columns('user')}
+        if 'version' not in user_columns:
+            with db.engine.begin() as conn:
+                conn.execute(db.text('ALTER TABLE user ADD COLUMN version INTEGER NOT NULL DEFAULT 1'))
+        assignment_columns = {column['name'] for column in db.inspect(db.engine).get_columns('item_assignment')}
+        if 'serial_number' not in assignment_columns:
+            with db.engine.begin() as conn:
+                conn.execute(db.text('ALTER TABLE item_assignment ADD COLUMN serial_number VARCHAR(100)'))
+                history.fill_serial_numbers(conn)
+                # The existing history triggers don't set it; replace them (keeping the history)
+                for (name,) in conn.execute(db.text(
+                        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'assignment_%'")).all():
+                    conn.execute(db.text(f'DROP TRIGGER {name}'))
+            history.install_triggers(db.engine)
+        # create_all() skips tables that already exist, so add any new indexes explicitly
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        if install_index(db.engine):
+            rebuild_index(db.engine)
+        if counters.install_triggers(db.engine):
+            counters.reconcile()
+        if history.install_triggers(db.engine):
+            history.backfill(db.engine)
+        # Create default admin user if not exists
+        if not User.query.filter_by(username='admin').first():
+            admin = User(
+                username='admin',
+                password=generate_password_hash('admin123'),
+                role='admin'
+            )
+            db.session.add(admin)
+            db.session.commit()
 
-with app.app_context():
-    db.create_all()
-    # Create default admin user if not exists
-    if not User.query.filter_by(username='admin').first():
-        admin = User(
-            username='admin',
-            password=generate_password_hash('admin123'),
-            role='admin'
-        )
-        db.session.add(admin)
-        db.session.commit()
-    print("Database tables created successfully!")
\ No newline at end of file
+
+if __name__ == '__main__':
+    # Same configuration as the app, so the SQLite profile (WAL) is applied to the file here
+    init_database(create_app())
+    print("Database tables created successfully!")
@@ -0,0 +1,134 @@
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# SQLite engine profile and an optional read/write connection split.
+#
+# SQLITE_PROFILE picks the pragmas run on every new connection:
+#   production - WAL journal (readers no longer block behind a writer),
+#                synchronous=NORMAL (safe with WAL, no fsync per commit),
+#                a 64 MB page cache, 256 MB of mmap, in-memory temp tables
+#                and SQLITE_BUSY_TIMEOUT_MS of waiting instead of failing
+#                with "database is locked"
+#   default    - SQLite's own defaults, apart from the busy timeout
+# SQLITE_PRAGMAS overrides individual pragmas on top of the profile.
+#
+# With SQLITE_READ_POOL enabled, SELECTs issued while handling GET and HEAD
+# requests run on a separate pool of query_only connections (the 'reader'
+# bind), and the default engine becomes a single writer connection, so
+# writers queue in the pool rather than contending for SQLite's lock.
+
+PROFILES = {
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+    'default': {},
+}
+
+READER = 'reader'
+
+# Keeps each IN (...) list well under SQLite's bound parameter limit (999 on older builds)
+IN_CHUNK = 500
+
+
+class RoutingSession(Session):
+    """Sends read-only statements to the reader bind while ``info['read_only']`` is set."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # After this transaction has written anything (cache.py records the
+        # touched tables on flush) keep reading from the writer, which can see it
+        if (bind is None and self.info.get('read_only') and not self._flushing
+                and not self.info.get('touched_tables') and isinstance(clause, Select)):
+            reader = self._db.engines.get(READER)
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def in_chunks(values, size=IN_CHUNK):
+    """Split ``values`` into lists short enough for one IN (...) clause."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def release_connection(session, *objects):
+    """End ``session``'s transaction so its connection goes back to the pool.
+
+    Call before slow work such as password hashing: with the read pool each
+    worker has a single writer connection, and holding it stalls every other
+    write. ``objects`` are detached first so the rollback doesn't expire them,
+    then re-attached so later changes to them are still flushed.
+    """
+    objects = [obj for obj in objects if obj is not None]
+    for obj in objects:
+        session.expunge(obj)
+    session.rollback()
+    for obj in objects:
+        session.add(obj)
+
+
+def is_sqlite(uri):
+    return str(uri).startswith('sqlite')
+
+
+def pragmas(config):
+    settings = dict(PROFILES[config.get('SQLITE_PROFILE', 'production')])
+    settings.update(config.get('SQLITE_PRAGMAS') or {})
+    # None leaves SQLite's own busy handling alone (the benchmark's baseline)
+    timeout = config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    if timeout is not None:
+        settings['busy_timeout'] = timeout
+    return settings
+
+
+def configure(app):
+    """Fill in engine options and binds; call before ``db.init_app(app)``."""
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if not is_sqlite(uri) or not app.config.get('SQLITE_READ_POOL'):
+        return
+    timeout = (app.config.get('SQLITE_BUSY_TIMEOUT_MS') or 5000) / 1000.0
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {}).update(
+        pool_size=1, max_overflow=0, pool_timeout=max(timeout, 30),
+    )
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[READER] = {
+        'url': uri,
+        'pool_size': app.config.get('SQLITE_READ_POOL_SIZE', 8),
+        'max_overflow': 0,
+    }
+
+
+def _on_connect(settings, read_only):
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            # journal_mode is a property of the file; set it from the writer only
+            if read_only and name == 'journal_mode':
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only = ON')
+        cursor.close()
+    return connect
+
+
+def init_app(app, db):
+    """Install the pragmas on every SQLite engine and route GET reads; call after ``db.init_app(app)``."""
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    settings = pragmas(app.config)
+    with app.app_context():
+        engines = dict(db.engines)
+    for key, engine in engines.items():
+        event.listen(engine, 'connect', _on_connect(settings, key == READER))
+
+    if READER in engines:
+        @app.before_request
+        def route_reads():
+            if request.method in ('GET', 'HEAD'):
+                db.session.info['read_only'] = True
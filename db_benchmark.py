@@ -0,0 +1,196 @@
+"""Compare request throughput under concurrent reads and writes per SQLite profile.
+
+Each configuration gets a fresh throwaway database. Readers and writers run
+as separate processes, like gunicorn workers, so they contend for SQLite's
+file lock rather than for one interpreter's GIL: reader processes page
+through the asset and employee lists while writer processes save items
+through the edit form. Reports completed requests per second, latency and
+failed requests (HTTP 500, usually "database is locked") for each.
+
+    python db_benchmark.py
+    python db_benchmark.py --seconds 10 --readers 8 --writers 2 --threads 4
+
+Configurations:
+    baseline              no PRAGMAs at all (only pysqlite's own 5 s lock
+                          wait), as the app shipped originally
+    default               SQLite defaults plus busy_timeout
+    production            the production profile (WAL and friends)
+    production+read-pool  production plus the per-worker reader pool; this
+                          only differs from production with --threads > 1,
+                          since the pool splits connections within a process
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+CONFIGS = {
+    'baseline': {'SQLITE_PROFILE': 'default', 'SQLITE_BUSY_TIMEOUT_MS': None, 'SQLITE_READ_POOL': False},
+    'default': {'SQLITE_PROFILE': 'default', 'SQLITE_READ_POOL': False},
+    'production': {'SQLITE_PROFILE': 'production', 'SQLITE_READ_POOL': False},
+    'production+read-pool': {'SQLITE_PROFILE': 'production', 'SQLITE_READ_POOL': True},
+}
+
+READ_PATHS = ['/assets', '/employees', '/assets?search=Laptop', '/person/1', '/']
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def _app(config, database):
+    from app import create_app
+    return create_app(dict(CONFIGS[config], SQLALCHEMY_DATABASE_URI=database))
+
+
+def setup(config, database):
+    from models import db, Person, InventoryItem, User, AuditLog
+    from query_budget import seed
+    from search import install_index, rebuild_index
+    import counters
+
+    app = _app(config, database)
+    with app.app_context():
+        db.create_all()
+        install_index(db.engine)
+        counters.install_triggers(db.engine)
+        seed(db, (Person, InventoryItem, User, AuditLog))
+        rebuild_index(db.engine)
+    return 0
+
+
+def worker(config, database, kind, threads, seconds):
+    from models import InventoryItem
+
+    app = _app(config, database)
+    with app.app_context():
+        items = [(i.id, i.item_type, i.serial_number, i.assigned_to_id)
+                 for i in InventoryItem.query.filter(InventoryItem.assigned_to_id.isnot(None))]
+    timings, failures = [], []
+    lock = threading.Lock()
+    ready = threading.Barrier(threads + 1)
+    go = threading.Event()
+    clock = {}
+
+    def run():
+        client = app.test_client()
+        client.post('/login', data={'username': 'admin', 'password': 'admin'})
+        rng = random.Random()
+        local, failed = [], 0
+        ready.wait()
+        go.wait()
+        while time.monotonic() < clock['deadline']:
+            started = time.perf_counter()
+            if kind == 'read':
+                response = client.get(rng.choice(READ_PATHS))
+            else:
+                item_id, item_type, serial_number, assigned_to_id = rng.choice(items)
+                response = client.post(f'/edit-item/{item_id}', data={
+                    'item_type': item_type,
+                    'serial_number': serial_number,
+                    'details': f'benchmark {rng.random():.6f}',
+                    'assigned_to': assigned_to_id,
+                })
+            if response.status_code >= 500:
+                failed += 1
+            else:
+                local.append(round((time.perf_counter() - started) * 1000, 2))
+        with lock:
+            timings.extend(local)
+            failures.append(failed)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    # Every process imports the app and logs in first; the parent starts them all at once
+    ready.wait()
+    print('ready', flush=True)
+    sys.stdin.readline()
+    clock['deadline'] = time.monotonic() + seconds
+    go.set()
+    for thread in pool:
+        thread.join()
+    print(json.dumps({'timings': timings, 'failed': sum(failures)}))
+    return 0
+
+
+def run_config(name, args):
+    workdir = tempfile.mkdtemp(prefix='db-benchmark-')
+    database = f"sqlite:///{os.path.join(workdir, 'benchmark.sqlite3')}"
+    base = [sys.executable, __file__, '--config', name, '--database', database]
+    subprocess.run(base + ['--setup'], check=True, capture_output=True, text=True)
+
+    roles = ['read'] * args.readers + ['write'] * args.writers
+    processes = [
+        (kind, subprocess.Popen(
+            base + ['--worker', kind, '--threads', str(args.threads), '--seconds', str(args.seconds)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        ))
+        for kind in roles
+    ]
+    for kind, process in processes:
+        if process.stdout.readline().strip() != 'ready':
+            raise SystemExit(f'{name}: {kind} worker failed to start')
+    for kind, process in processes:
+        process.stdin.write('go\n')
+        process.stdin.flush()
+    results = {'read': [], 'write': []}
+    failures = {'read': 0, 'write': 0}
+    for kind, process in processes:
+        output, _ = process.communicate()
+        if process.returncode:
+            raise SystemExit(f'{name}: {kind} worker exited with {process.returncode}')
+        result = json.loads(output.strip().splitlines()[-1])
+        results[kind].extend(result['timings'])
+        failures[kind] += result['failed']
+    return {
+        kind: {
+            'per_second': round(len(timings) / args.seconds, 1),
+            'p50_ms': round(_percentile(timings, 0.5), 1),
+            'p95_ms': round(_percentile(timings, 0.95), 1),
+            'failed': failures[kind],
+        }
+        for kind, timings in results.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('configs', nargs='*', default=list(CONFIGS), help=', '.join(CONFIGS))
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=6, help='reader processes')
+    parser.add_argument('--writers', type=int, default=2, help='writer processes')
+    parser.add_argument('--threads', type=int, default=1, help='client threads per process')
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    parser.add_argument('--setup', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', choices=('read', 'write'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.setup:
+        return setup(args.config, args.database)
+    if args.worker:
+        return worker(args.config, args.database, args.worker, args.threads, args.seconds)
+    unknown = set(args.configs) - set(CONFIGS)
+    if unknown:
+        parser.error(f"unknown config: {', '.join(sorted(unknown))}")
+
+    print(f'{args.readers} reader and {args.writers} writer processes, {args.threads} thread(s) each, {args.seconds:g}s')
+    print(f'{"config":<22} {"reads/s":>8} {"p50":>7} {"p95":>7} {"failed":>7} '
+          f'{"writes/s":>9} {"p50":>7} {"p95":>7} {"failed":>7}')
+    for name in args.configs:
+        result = run_config(name, args)
+        read, write = result['read'], result['write']
+        print(f'{name:<22} {read["per_second"]:>8} {read["p50_ms"]:>5}ms {read["p95_ms"]:>5}ms {read["failed"]:>7} '
+              f'{write["per_second"]:>9} {write["p50_ms"]:>5}ms {write["p95_ms"]:>5}ms {write["failed"]:>7}', flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
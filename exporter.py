@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from models import db, Person, InventoryItem, User, AuditLog
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _people(filters):
+    stmt = select(
+        Person.id,
+        Person.first_name,
+        Person.last_name,
+        Person.email,
+        Person.department,
+    )
+    if filters.get('department'):
+        stmt = stmt.where(Person.department == filters['department'])
+    return stmt, Person.id, Person.created_at
+
+
+def _items(filters):
+    # Assignee columns come from the same query, so there is no per-row lookup
+    stmt = select(
+        InventoryItem.id,
+        InventoryItem.item_type,
+        InventoryItem.serial_number,
+        InventoryItem.details,
+        InventoryItem.status,
+        Person.email.label('assigned_to_email'),
+        (Person.first_name + ' ' + Person.last_name).label('assigned_to_name'),
+        Person.department.label('assigned_to_department'),
+        InventoryItem.created_at,
+        InventoryItem.updated_at,
+    ).select_from(InventoryItem).outerjoin(Person, InventoryItem.assigned_to_id == Person.id)
+    if filters.get('department'):
+        stmt = stmt.where(Person.department == filters['department'])
+    if filters.get('status'):
+        stmt = stmt.where(InventoryItem.status == filters['status'])
+    return stmt, InventoryItem.id, InventoryItem.created_at
+
+
+def _audit(filters):
+    stmt = select(
+        AuditLog.id,
+        AuditLog.timestamp,
+        User.username,
+        AuditLog.action,
+        AuditLog.model_type,
+        AuditLog.model_id,
+        AuditLog.details,
+    ).select_from(AuditLog).outerjoin(User, AuditLog.user_id == User.id)
+    return stmt, AuditLog.id, AuditLog.timestamp
+
+
+DATASETS = {
+    # The people export keeps the import column layout, so it has no id column
+    'people': {'build': _people, 'filename': 'persons', 'model_type': 'Person', 'include_key': False},
+    'items': {'build': _items, 'filename': 'inventory_items', 'model_type': 'InventoryItem', 'include_key': True},
+    'audit': {'build': _audit, 'filename': 'audit_log', 'model_type': 'AuditLog', 'include_key': True},
+}
+
+
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ExportError(f'{name} must be a date in YYYY-MM-DD format')
+
+
+def build_export(dataset, filters):
+    """Return ``(statement, key_column)`` for a dataset with ``filters`` applied in SQL."""
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown export: {dataset}')
+    stmt, key_column, date_column = DATASETS[dataset]['build'](filters)
+    if filters.get('date_from'):
+        stmt = stmt.where(date_column >= _parse_date(filters['date_from'], 'From date'))
+    if filters.get('date_to'):
+        # The end date is inclusive
+        stmt = stmt.where(date_column < _parse_date(filters['date_to'], 'To date') + timedelta(days=1))
+    return stmt, key_column
+
+
+def iter_rows(stmt, key_column, chunk_size=1000):
+    # Each chunk is its own short statement, so a slow download never holds a
+    # read cursor open (and a lock on the database) for the whole transfer.
+    last_key = None
+    while True:
+        chunk_stmt = stmt.order_by(key_column).limit(chunk_size)
+        if last_key is not None:
+            chunk_stmt = chunk_stmt.where(key_column > last_key)
+        rows = db.session.execute(chunk_stmt).all()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_key = rows[-1][0]
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ', timespec='seconds')
+    return value
+
+
+def generate(stmt, key_column, include_key, fmt, chunk_size=1000):
+    columns = list(stmt.selected_columns.keys())
+    start = 0 if include_key else 1
+    columns = columns[start:]
+    buffer = io.StringIO()
+
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    pending = 0
+    for row in iter_rows(stmt, key_column, chunk_size):
+        values = row[start:]
+        if fmt == 'csv':
+            writer.writerow([_cell(v) for v in values])
+        else:
+            buffer.write(json.dumps(dict(zip(columns, values)), default=_cell) + '\n')
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,12 @@
+import multiprocessing
+import os
+
+# gunicorn -c gunicorn.conf.py wsgi:app
+bind = os.environ.get('BIND', '0.0.0.0:9000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# More than one thread switches gunicorn to the gthread worker
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+accesslog = '-'
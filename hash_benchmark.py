@@ -0,0 +1,88 @@
+"""Report password hash latency for candidate PASSWORD_HASH_METHOD settings.
+
+For each method this times single hashes and checks on the calling thread,
+then pushes a burst of concurrent logins through a HashPool the size of the
+configured one to show throughput and how many would be turned away.
+
+    python hash_benchmark.py
+    python hash_benchmark.py scrypt:16384:8:1 pbkdf2:sha256:600000 --rounds 20 --burst 50
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from passwords import HashPool, HashingBusy, method_signature
+
+METHODS = [
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+]
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def time_calls(fn, rounds):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def burst(method, pwhash, size, workers, queue_size):
+    pool = HashPool(method, workers=workers, queue_size=queue_size, timeout=60)
+    rejected = []
+    start = threading.Barrier(size)
+
+    def login():
+        start.wait()
+        try:
+            pool.check(pwhash, 'benchmark-password')
+        except HashingBusy:
+            rejected.append(1)
+
+    threads = [threading.Thread(target=login) for _ in range(size)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    return elapsed, len(rejected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('methods', nargs='*', default=METHODS)
+    parser.add_argument('--rounds', type=int, default=10, help='sequential hashes per method')
+    parser.add_argument('--burst', type=int, default=30, help='concurrent logins in the burst test')
+    parser.add_argument('--workers', type=int, default=2, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--queue', type=int, default=16, help='PASSWORD_HASH_QUEUE')
+    args = parser.parse_args(argv)
+
+    print(f'{"method":<24} {"hash p50":>9} {"hash p95":>9} {"check p50":>10} '
+          f'{"burst":>8} {"logins/s":>9} {"rejected":>9}')
+    for method in args.methods:
+        pwhash = generate_password_hash('benchmark-password', method=method)
+        hashes = time_calls(lambda: generate_password_hash('benchmark-password', method=method), args.rounds)
+        checks = time_calls(lambda: check_password_hash(pwhash, 'benchmark-password'), args.rounds)
+        elapsed, rejected = burst(method, pwhash, args.burst, args.workers, args.queue)
+        served = args.burst - rejected
+        print(f'{method_signature(method):<24} {statistics.median(hashes):>7.1f}ms {_percentile(hashes, 0.95):>7.1f}ms '
+              f'{statistics.median(checks):>8.1f}ms {elapsed:>7.2f}s {served / elapsed:>9.1f} {rejected:>9}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import re
+from itertools import groupby
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.orm import joinedload
+
+from database import in_chunks
+from models import Person, InventoryItem, AuditLog, ItemAssignment
+
+# Assignment history: one item_assignment row per stretch of time an item was
+# held by a person. Triggers on inventory_item close the open row and start a
+# new one whenever assigned_to_id changes, so every write path (the item
+# forms, the bulk API, CSV import, raw SQL) is recorded without extra code.
+# Timestamps come from the row's updated_at when the write set it, so they
+# line up with the audit log entry for the same change. Each row also keeps
+# the item's serial number (kept current if it is edited), so a deleted
+# item's history can still be found by serial.
+#
+# "Who had X on D" and "what did P hold last quarter" are index range scans
+# on (item_id, started_at) and (person_id, started_at).
+
+# Same text format SQLAlchemy stores DateTime values in, so comparisons hold
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now') || '000'"
+_CHANGED_AT = f"CASE WHEN new.updated_at IS NOT old.updated_at THEN new.updated_at ELSE {_NOW} END"
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS assignment_item_ai AFTER INSERT ON inventory_item
+    WHEN new.assigned_to_id IS NOT NULL BEGIN
+        INSERT INTO item_assignment (item_id, serial_number, person_id, started_at)
+        VALUES (new.id, new.serial_number, new.assigned_to_id, coalesce(new.updated_at, {_NOW}));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS assignment_item_au AFTER UPDATE OF assigned_to_id ON inventory_item
+    WHEN old.assigned_to_id IS NOT new.assigned_to_id BEGIN
+        UPDATE item_assignment SET ended_at = {_CHANGED_AT} WHERE item_id = old.id AND ended_at IS NULL;
+        INSERT INTO item_assignment (item_id, serial_number, person_id, started_at)
+        SELECT new.id, new.serial_number, new.assigned_to_id, {_CHANGED_AT} WHERE new.assigned_to_id IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS assignment_item_serial AFTER UPDATE OF serial_number ON inventory_item
+    WHEN old.serial_number IS NOT new.serial_number BEGIN
+        UPDATE item_assignment SET serial_number = new.serial_number WHERE item_id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS assignment_item_ad AFTER DELETE ON inventory_item BEGIN
+        UPDATE item_assignment SET ended_at = {_NOW} WHERE item_id = old.id AND ended_at IS NULL;
+    END""",
+]
+
+
+def install_triggers(engine):
+    """Create the history triggers if missing; returns True if any were created."""
+    with engine.begin() as conn:
+        existing = {name for (name,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'assignment_%'"
+        ))}
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+    return len(existing) < len(TRIGGERS)
+
+
+def open_missing(conn):
+    """Start an open assignment for every assigned item without one (after loads that bypassed the triggers)."""
+    return conn.execute(text(
+        "INSERT INTO item_assignment (item_id, serial_number, person_id, started_at) "
+        "SELECT i.id, i.serial_number, i.assigned_to_id, i.updated_at FROM inventory_item i "
+        "WHERE i.assigned_to_id IS NOT NULL AND NOT EXISTS "
+        "(SELECT 1 FROM item_assignment a WHERE a.item_id = i.id AND a.ended_at IS NULL)"
+    )).rowcount
+
+
+# Every item audit entry names the item as "<type> (<serial>)"
+_SERIAL = re.compile(r'\(([^()]*)\)')
+
+
+def fill_serial_numbers(conn):
+    """Copy serial numbers onto assignments without one; deleted items' come from their last audit entry."""
+    conn.execute(text(
+        "UPDATE item_assignment SET serial_number = "
+        "(SELECT serial_number FROM inventory_item i WHERE i.id = item_assignment.item_id) "
+        "WHERE serial_number IS NULL"
+    ))
+    table = ItemAssignment.__table__
+    audit = AuditLog.__table__
+    missing = [item_id for (item_id,) in conn.execute(
+        select(table.c.item_id).where(table.c.serial_number.is_(None)).distinct())]
+    for chunk in in_chunks(missing):
+        serials = {}
+        for model_id, details in conn.execute(
+                select(audit.c.model_id, audit.c.details)
+                .where(audit.c.model_type == 'InventoryItem', audit.c.model_id.in_(chunk))
+                .order_by(audit.c.timestamp, audit.c.id)):
+            found = _SERIAL.search(details or '')
+            if found:
+                serials[model_id] = found.group(1)
+        for item_id, serial_number in serials.items():
+            conn.execute(table.update().where(table.c.item_id == item_id).values(serial_number=serial_number))
+
+
+def active_at(at):
+    return and_(ItemAssignment.started_at <= at,
+                or_(ItemAssignment.ended_at.is_(None), ItemAssignment.ended_at > at))
+
+
+def overlapping(start=None, end=None):
+    """Assignments that were open at any moment in [start, end); either bound may be None."""
+    conditions = []
+    if end is not None:
+        conditions.append(ItemAssignment.started_at < end)
+    if start is not None:
+        conditions.append(or_(ItemAssignment.ended_at.is_(None), ItemAssignment.ended_at > start))
+    return and_(True, *conditions)
+
+
+def holder_at(item_id, at):
+    """The assignment covering ``at`` for an item, or None if it was in stock (or did not exist)."""
+    return (ItemAssignment.query.options(joinedload(ItemAssignment.person))
+            .filter(ItemAssignment.item_id == item_id, active_at(at))
+            .order_by(ItemAssignment.started_at.desc())
+            .first())
+
+
+def held_at(person_id, at):
+    """Assignments a person held at ``at``."""
+    return (ItemAssignment.query.options(joinedload(ItemAssignment.item))
+            .filter(ItemAssignment.person_id == person_id, active_at(at))
+            .order_by(ItemAssignment.started_at)
+            .all())
+
+
+def person_timeline(person_id, start=None, end=None):
+    """Query of a person's assignments overlapping [start, end), with the items loaded."""
+    return (ItemAssignment.query.options(joinedload(ItemAssignment.item))
+            .filter(ItemAssignment.person_id == person_id, overlapping(start, end)))
+
+
+def item_timeline(item_id, start=None, end=None):
+    """An item's assignments overlapping [start, end), newest first, with the people loaded."""
+    return (ItemAssignment.query.options(joinedload(ItemAssignment.person))
+            .filter(ItemAssignment.item_id == item_id, overlapping(start, end))
+            .order_by(ItemAssignment.started_at.desc(), ItemAssignment.id.desc())
+            .all())
+
+
+# Backfill from the audit log. Audit details are free text and most of them
+# don't name the assignee ("Updated item: Laptop (SN)"), so this is a best
+# effort: bulk assign/transfer entries name the person, an item's current
+# holder is known from inventory_item, and stretches whose holder can't be
+# worked out are left out rather than guessed.
+
+_UNKNOWN = object()
+
+
+def _event(action, details, people):
+    """Turn an item audit entry into ('assign', person id or _UNKNOWN), ('end', None) or None."""
+    details = details or ''
+    if action == 'delete' or details.startswith('Bulk return to stock: '):
+        return 'end', None
+    if details.startswith(('Bulk assign: ', 'Bulk transfer: ')):
+        return 'assign', people.get(details.rpartition(' to ')[2], _UNKNOWN)
+    if details.startswith('Bulk status: '):
+        return ('end', None) if details.endswith('-> stock') else None
+    if details.startswith(('Added item: ', 'Imported item: ', 'Updated item: ')):
+        return ('end', None) if details.endswith(' to stock') else ('assign', _UNKNOWN)
+    return None
+
+
+def _replay(item, events, people):
+    """Rebuild one item's assignments; returns (rows, number of stretches left unattributed)."""
+    rows, unattributed = [], 0
+    holder = started = None
+    # Edits that might have changed the holder; the form's audit text doesn't say
+    candidates = []
+
+    def close(at):
+        nonlocal holder, started, unattributed
+        if holder is _UNKNOWN:
+            unattributed += 1
+        elif holder is not None:
+            rows.append({'person_id': holder, 'started_at': started, 'ended_at': at})
+        holder = started = None
+
+    for timestamp, action, details in events:
+        event = _event(action, details, people)
+        if event is None:
+            continue
+        kind, person_id = event
+        if kind == 'end':
+            close(timestamp)
+        elif holder is None:
+            holder, started, candidates = person_id, timestamp, []
+        elif person_id is _UNKNOWN:
+            # Most edits leave the holder alone; remember where it may have changed
+            candidates.append(timestamp)
+        elif person_id != holder:
+            close(timestamp)
+            holder, started, candidates = person_id, timestamp, []
+
+    if item is None:
+        # Deleted item whose delete entry has been archived: the end is unknown
+        if holder is not None:
+            unattributed += 1
+        return rows, unattributed
+    current = item.assigned_to_id
+    if holder is not None and holder is not _UNKNOWN and holder != current:
+        # The holder changed at one of the candidate edits: the old one certainly
+        # held it until the first, the current one certainly since the last
+        if candidates:
+            close(candidates[0])
+            if len(candidates) > 1:
+                unattributed += 1
+            changed = candidates[-1]
+        else:
+            changed = item.updated_at
+            close(changed)
+        if current is not None:
+            holder, started = current, changed
+    elif holder is _UNKNOWN:
+        # Any of the later edits may have reassigned it, so the current holder
+        # only certainly has it since the last one; the stretch before is skipped
+        if candidates or current is None:
+            unattributed += 1
+        if candidates:
+            started = candidates[-1]
+        holder = current
+    elif holder is None and current is not None:
+        # No usable audit entries (e.g. archived): start from the last change to the row
+        holder, started = current, item.updated_at if events else item.created_at
+    if holder is not None:
+        rows.append({'person_id': holder, 'started_at': started, 'ended_at': None})
+    return rows, unattributed
+
+
+def _items_with_events(conn):
+    """Yield (item id, inventory row or None, [(timestamp, action, details)]) in item id order."""
+    item = InventoryItem.__table__
+    audit = AuditLog.__table__
+    items = iter(conn.execute(
+        select(item.c.id, item.c.serial_number, item.c.assigned_to_id, item.c.created_at, item.c.updated_at)
+        .order_by(item.c.id)))
+    entries = conn.execute(
+        select(audit.c.model_id, audit.c.timestamp, audit.c.action, audit.c.details)
+        .where(audit.c.model_type == 'InventoryItem', audit.c.action.in_(('create', 'update', 'delete')))
+        .order_by(audit.c.model_id, audit.c.timestamp, audit.c.id))
+    groups = groupby(entries, key=lambda entry: entry.model_id)
+    row, group = next(items, None), next(groups, None)
+    while row is not None or group is not None:
+        if group is None or (row is not None and row.id < group[0]):
+            yield row.id, row, []
+            row = next(items, None)
+            continue
+        events = [(entry.timestamp, entry.action, entry.details) for entry in group[1]]
+        if row is not None and row.id == group[0]:
+            yield row.id, row, events
+            row = next(items, None)
+        else:
+            yield group[0], None, events
+        group = next(groups, None)
+
+
+def backfill(engine, batch_size=5000):
+    """Replace item_assignment with history rebuilt from the audit log; returns a summary dict."""
+    table = ItemAssignment.__table__
+    summary = {'items': 0, 'assignments': 0, 'unattributed': 0}
+    with engine.begin() as conn:
+        # Full names that identify exactly one person, for the bulk entries
+        names = {}
+        for person_id, first_name, last_name in conn.execute(
+                select(Person.__table__.c.id, Person.__table__.c.first_name, Person.__table__.c.last_name)):
+            name = f'{first_name} {last_name}'
+            names[name] = _UNKNOWN if name in names else person_id
+        conn.execute(table.delete())
+        batch = []
+        for item_id, item, events in _items_with_events(conn):
+            rows, unattributed = _replay(item, events, names)
+            summary['items'] += 1
+            summary['unattributed'] += unattributed
+            if item is not None:
+                serial_number = item.serial_number
+            else:
+                # Deleted: take the serial from its last audit entry
+                found = _SERIAL.search(events[-1][2] or '')
+                serial_number = found.group(1) if found else None
+            batch += [dict(row, item_id=item_id, serial_number=serial_number) for row in rows]
+            if len(batch) >= batch_size:
+                conn.execute(table.insert(), batch)
+                summary['assignments'] += len(batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+            summary['assignments'] += len(batch)
+    return summary
@@ -0,0 +1,134 @@
+"""Check that assignment history is recorded and rebuilt correctly.
+
+Builds a throwaway database, makes changes through the Flask test client so
+the audit log reads exactly as it does in production, throws the trigger-made
+history away and rebuilds it with history.backfill(). Exits non-zero if the
+rebuilt rows don't match what actually happened.
+
+    python history_check.py
+"""
+import os
+import sys
+import tempfile
+
+PASSWORD = 'admin'
+
+
+def _assignments(item_id):
+    from models import ItemAssignment
+    return [(a.person_id, a.started_at, a.ended_at)
+            for a in ItemAssignment.query.filter_by(item_id=item_id).order_by(ItemAssignment.started_at)]
+
+
+def create_then_edit(app, client):
+    """SN1 is added for Ann, then reassigned to Bob with the edit form."""
+    from models import db, Person, InventoryItem, AuditLog
+
+    with app.app_context():
+        ann = Person(first_name='Ann', last_name='Check', email='ann@example.com', department='QA')
+        bob = Person(first_name='Bob', last_name='Check', email='bob@example.com', department='QA')
+        db.session.add_all([ann, bob])
+        db.session.commit()
+        ann_id, bob_id = ann.id, bob.id
+
+    client.post('/add-item', data={'item_type': 'Laptop', 'serial_number': 'SN1', 'details': '', 'assigned_to': ann_id})
+    with app.app_context():
+        item_id = InventoryItem.query.filter_by(serial_number='SN1').one().id
+    client.post(f'/edit-item/{item_id}', data={'item_type': 'Laptop', 'serial_number': 'SN1', 'details': '',
+                                               'assigned_to': bob_id})
+
+    with app.app_context():
+        expected = _assignments(item_id)
+        edited = (db.session.query(AuditLog.timestamp)
+                  .filter_by(model_type='InventoryItem', model_id=item_id, action='update').scalar())
+        import history
+        summary = history.backfill(db.engine)
+        rebuilt = _assignments(item_id)
+
+    problems = []
+    if [person_id for person_id, _, _ in expected] != [ann_id, bob_id]:
+        problems.append(f'triggers recorded {expected}')
+    current = [row for row in rebuilt if row[2] is None]
+    if len(current) != 1 or current[0][0] != bob_id:
+        problems.append(f'current holder should be Bob ({bob_id}), got {rebuilt}')
+    elif current[0][1] != edited:
+        problems.append(f"Bob's stretch should start at the edit ({edited}), got {current[0][1]}")
+    if any(person_id == ann_id for person_id, _, _ in rebuilt):
+        # The form's audit text doesn't name Ann, so her stretch can't be attributed
+        problems.append(f'Ann should be left unattributed, got {rebuilt}')
+    if summary['unattributed'] < 1:
+        problems.append(f"the stretch before the edit should count as unattributed, got {summary}")
+    return problems
+
+
+def deleted_item_lookup(app, client):
+    """SN2 is bulk-assigned to Cat and deleted; its serial still finds its history, before and after a backfill."""
+    from models import db, Person, InventoryItem
+    import history
+
+    with app.app_context():
+        cat = Person(first_name='Cat', last_name='Check', email='cat@example.com', department='QA')
+        db.session.add(cat)
+        db.session.commit()
+        cat_id = cat.id
+    client.post('/add-item', data={'item_type': 'Phone', 'serial_number': 'SN2', 'details': '', 'is_stock': 'on'})
+    # The bulk API's audit entries name the person, so the backfill can attribute this one
+    client.post('/api/items/bulk', json={'operation': 'assign', 'serials': ['SN2'], 'person_id': cat_id})
+    with app.app_context():
+        item_id = InventoryItem.query.filter_by(serial_number='SN2').one().id
+    client.post(f'/delete-item/{item_id}')
+
+    problems = []
+    for when in ('from the triggers', 'after a backfill'):
+        if when == 'after a backfill':
+            with app.app_context():
+                history.backfill(db.engine)
+        response = client.get('/history?serial_number=SN2')
+        if response.status_code != 302 or not response.location.endswith(f'/item/{item_id}/history'):
+            problems.append(f'SN2 {when}: HTTP {response.status_code} to {response.location}')
+    response = client.get('/history?serial_number=SN-TYPO')
+    if response.status_code != 302 or '/history' in response.location:
+        problems.append(f'unknown serial: HTTP {response.status_code} to {response.location}')
+    return problems
+
+
+CHECKS = [create_then_edit, deleted_item_lookup]
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='history-check-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'history.sqlite3')}"
+    # The backfill reads the audit log, so entries must be written before each request returns
+    os.environ['AUDIT_MODE'] = 'sync'
+
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models import db, User
+    from search import install_index
+    import counters
+    import history
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        install_index(db.engine)
+        counters.install_triggers(db.engine)
+        history.install_triggers(db.engine)
+        db.session.add(User(username='admin', password=generate_password_hash(PASSWORD), role='admin'))
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': PASSWORD})
+
+    failures = 0
+    for check in CHECKS:
+        problems = check(app, client)
+        print(f"{'FAIL' if problems else 'ok  '} {check.__name__}")
+        for problem in problems:
+            print('       ' + problem)
+        failures += bool(problems)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Check that CSV imports land their rows.
+
+Builds a throwaway database, uploads people and item files through the
+import form exactly as a browser would and counts what was written. Exits
+non-zero if any import reports an error or its rows are missing.
+
+    python import_check.py
+"""
+import io
+import os
+import re
+import sys
+import tempfile
+
+PASSWORD = 'admin'
+
+
+def _upload(client, kind, text):
+    response = client.post('/import-csv', data={
+        'kind': kind,
+        'csv_file': (io.BytesIO(text.encode('utf-8')), f'{kind}.csv'),
+    }, content_type='multipart/form-data', follow_redirects=True)
+    messages = [' '.join(m.split()) for m in re.findall(r'class="alert[^"]*"[^>]*>(.*?)<button', response.get_data(as_text=True), re.S)]
+    return response.status_code, messages
+
+
+def people(app, client):
+    """A small file with the BOM spreadsheet exports add."""
+    from models import Person
+    text = '\ufefffirst_name,last_name,department,email\n' + ''.join(
+        f'Import{n},Check,QA,import{n}.check@example.com\n' for n in range(25))
+    status, messages = _upload(client, 'people', text)
+    with app.app_context():
+        landed = Person.query.filter(Person.last_name == 'Check').count()
+    problems = []
+    if status != 200 or messages != ['Successfully imported 25 person(s)']:
+        problems.append(f'HTTP {status}: {messages}')
+    if landed != 25:
+        problems.append(f'expected 25 people, found {landed}')
+    return problems
+
+
+def items(app, client):
+    """A file past werkzeug's in-memory limit, so the upload is spooled to disk."""
+    from models import InventoryItem
+    rows = 12000
+    text = 'item_type,serial_number,details,assigned_to_email\n' + ''.join(
+        f'Laptop,IMPORT-CHECK-{n:06d},imported by import_check.py,{"import1.check@example.com" if n % 3 == 0 else ""}\n'
+        for n in range(rows))
+    status, messages = _upload(client, 'items', text)
+    with app.app_context():
+        landed = InventoryItem.query.filter(InventoryItem.serial_number.like('IMPORT-CHECK-%')).count()
+        assigned = InventoryItem.query.filter(InventoryItem.serial_number.like('IMPORT-CHECK-%'),
+                                              InventoryItem.assigned_to_id.isnot(None)).count()
+    problems = []
+    if len(text) <= 500 * 1024:
+        problems.append(f'the file is only {len(text)} bytes and would not be spooled to disk')
+    if status != 200 or messages != [f'Successfully imported {rows} item(s)']:
+        problems.append(f'HTTP {status}: {messages}')
+    if landed != rows or assigned != rows // 3:
+        problems.append(f'expected {rows} items ({rows // 3} assigned), found {landed} ({assigned} assigned)')
+    return problems
+
+
+CHECKS = [people, items]
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='import-check-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'import.sqlite3')}"
+
+    from werkzeug.security import generate_password_hash
+    from app import create_app
+    from models import db, User
+    from search import install_index
+    import counters
+    import history
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        install_index(db.engine)
+        counters.install_triggers(db.engine)
+        history.install_triggers(db.engine)
+        db.session.add(User(username='admin', password=generate_password_hash(PASSWORD), role='admin'))
+        db.session.commit()
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': PASSWORD})
+
+    failures = 0
+    for check in CHECKS:
+        problems = check(app, client)
+        print(f"{'FAIL' if problems else 'ok  '} {check.__name__}")
+        for problem in problems:
+            print('       ' + problem)
+        failures += bool(problems)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+import csv
+import io
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert
+
+from cache import mark_touched
+from database import in_chunks
+from models import db, Person, InventoryItem, AuditLog
+
+PERSON_REQUIRED = {'first_name', 'last_name', 'department'}
+ITEM_REQUIRED = {'item_type', 'serial_number'}
+
+# Cap on the per-row problems kept for the report; counts are always exact.
+MAX_REPORTED_ROWS = 500
+
+
+class CsvImportError(ValueError):
+    pass
+
+
+class ImportResult:
+    def __init__(self, kind):
+        self.kind = kind
+        self.created = 0
+        self.skipped = 0
+        self.failed = 0
+        self.rows = []
+
+    def _report(self, line, status, message):
+        if len(self.rows) < MAX_REPORTED_ROWS:
+            self.rows.append({'line': line, 'status': status, 'message': message})
+
+    def skip(self, line, message):
+        self.skipped += 1
+        self._report(line, 'skipped', message)
+
+    def fail(self, line, message):
+        self.failed += 1
+        self._report(line, 'error', message)
+
+    @property
+    def truncated(self):
+        return self.skipped + self.failed > len(self.rows)
+
+
+class _RawUpload(io.RawIOBase):
+    """Read-only raw stream over an upload's file object.
+
+    werkzeug spools uploads to a SpooledTemporaryFile, which only gained
+    readable() and the rest of the IOBase interface that TextIOWrapper
+    relies on in Python 3.11; this needs nothing but read().
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_upload(file_storage):
+    # Decode incrementally instead of reading the whole upload into memory;
+    # utf-8-sig also drops the BOM that spreadsheet exports like to add.
+    return io.TextIOWrapper(io.BufferedReader(_RawUpload(file_storage.stream)), encoding='utf-8-sig', newline='')
+
+
+def _chunks(reader, size):
+    while True:
+        chunk = []
+        for row in islice(reader, size):
+            chunk.append((reader.line_num, row))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _clean(row, field):
+    return (row.get(field) or '').strip()
+
+
+def _check_columns(reader, required, message):
+    if reader.fieldnames is None or not required.issubset(f.strip() for f in reader.fieldnames):
+        raise CsvImportError(message)
+    reader.fieldnames = [f.strip() for f in reader.fieldnames]
+
+
+def _write_chunk(model, key, rows, audits, tables):
+    if rows:
+        # Plain executemany; asking for the new ids back makes SQLite insert row by row
+        db.session.execute(insert(model), rows)
+        column = getattr(model, key)
+        ids = {}
+        for keys in in_chunks(row[key] for row in rows):
+            ids.update(db.session.query(column, model.id).filter(column.in_(keys)))
+        now = datetime.utcnow()
+        audit_rows = []
+        for row, (user_id, details) in zip(rows, audits):
+            audit_rows.append({
+                'action': 'create',
+                'model_type': model.__name__,
+                'model_id': ids[row[key]],
+                'user_id': user_id,
+                'details': details,
+                'timestamp': now,
+            })
+        db.session.bulk_insert_mappings(AuditLog, audit_rows)
+        mark_touched(db.session, *tables)
+    db.session.commit()
+
+
+def import_people(stream, user_id, chunk_size=500, result=None):
+    reader = csv.DictReader(stream)
+    _check_columns(reader, PERSON_REQUIRED,
+                   'CSV must include columns: first_name, last_name, department (email is optional)')
+    # Pass a result in to see how far an import got if a later chunk fails
+    result = result or ImportResult('people')
+    seen_emails = {email for (email,) in db.session.query(Person.email).yield_per(5000)}
+
+    for chunk in _chunks(reader, chunk_size):
+        rows, audits = [], []
+        now = datetime.utcnow()
+        for line, row in chunk:
+            first_name = _clean(row, 'first_name')
+            last_name = _clean(row, 'last_name')
+            department = _clean(row, 'department')
+            if not all([first_name, last_name, department]):
+                result.fail(line, 'first_name, last_name and department are required')
+                continue
+            email = _clean(row, 'email') or f'{first_name.lower()}.{last_name.lower()}@company.com'
+            if email in seen_emails:
+                result.skip(line, f'Email {email} already exists')
+                continue
+            seen_emails.add(email)
+            rows.append({
+                'first_name': first_name,
+                'last_name': last_name,
+                'email': email,
+                'department': department,
+                'created_at': now,
+                'updated_at': now,
+            })
+            audits.append((user_id, f'Imported person: {first_name} {last_name}'))
+        _write_chunk(Person, 'email', rows, audits, ('person', 'audit_log'))
+        result.created += len(rows)
+    return result
+
+
+def import_items(stream, user_id, chunk_size=500, result=None):
+    reader = csv.DictReader(stream)
+    _check_columns(reader, ITEM_REQUIRED,
+                   'CSV must include columns: item_type, serial_number (details and assigned_to_email are optional)')
+    result = result or ImportResult('items')
+    seen_serials = {serial for (serial,) in db.session.query(InventoryItem.serial_number).yield_per(5000)}
+
+    for chunk in _chunks(reader, chunk_size):
+        # Resolve the chunk's assignees with IN queries rather than one lookup per row
+        wanted = {_clean(row, 'assigned_to_email') for _, row in chunk} - {''}
+        people = {}
+        for emails in in_chunks(wanted):
+            people.update(db.session.query(Person.email, Person.id).filter(Person.email.in_(emails)))
+
+        rows, audits = [], []
+        now = datetime.utcnow()
+        for line, row in chunk:
+            item_type = _clean(row, 'item_type')
+            serial_number = _clean(row, 'serial_number')
+            if not all([item_type, serial_number]):
+                result.fail(line, 'item_type and serial_number are required')
+                continue
+            if serial_number in seen_serials:
+                result.skip(line, f'Serial number {serial_number} already exists')
+                continue
+            email = _clean(row, 'assigned_to_email')
+            assigned_to_id = None
+            if email:
+                assigned_to_id = people.get(email)
+                if assigned_to_id is None:
+                    result.fail(line, f'No employee with email {email}')
+                    continue
+            seen_serials.add(serial_number)
+            rows.append({
+                'item_type': item_type,
+                'serial_number': serial_number,
+                'details': _clean(row, 'details'),
+                'assigned_to_id': assigned_to_id,
+                'status': 'active' if assigned_to_id else 'stock',
+                'created_at': now,
+                'updated_at': now,
+            })
+            audits.append((user_id, f'Imported item: {item_type} ({serial_number})' + ('' if assigned_to_id else ' to stock')))
+        _write_chunk(InventoryItem, 'serial_number', rows, audits, ('inventory_item', 'audit_log'))
+        result.created += len(rows)
+    return result
@@ -0,0 +1,174 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Opt-in per-request profiling. Nothing is hooked up unless INSTRUMENTATION_ENABLED
+# is set, so the disabled path costs nothing beyond a config lookup at startup.
+
+logger = logging.getLogger('equipment_tracking.perf')
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class RequestStats:
+    """Rolling window of per-endpoint request timings."""
+
+    def __init__(self, window=1000, slow_statements=20):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(int)
+        self._slowest = deque(maxlen=slow_statements)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration_ms, queries, db_ms, render_ms):
+        with self._lock:
+            self._samples[endpoint].append((duration_ms, queries, db_ms, render_ms))
+            self._totals[endpoint] += 1
+
+    def record_slow(self, endpoint, statement, duration_ms):
+        with self._lock:
+            self._slowest.append({
+                'endpoint': endpoint,
+                'statement': ' '.join(statement.split())[:500],
+                'duration_ms': round(duration_ms, 2),
+                'at': time.time(),
+            })
+
+    def snapshot(self):
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+            totals = dict(self._totals)
+            slowest = sorted(self._slowest, key=lambda s: s['duration_ms'], reverse=True)
+        rows = []
+        for endpoint, values in sorted(samples.items()):
+            durations = sorted(v[0] for v in values)
+            n = len(values)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': totals[endpoint],
+                'window': n,
+                'p50': round(percentile(durations, 50), 2),
+                'p95': round(percentile(durations, 95), 2),
+                'p99': round(percentile(durations, 99), 2),
+                'max': round(durations[-1], 2),
+                'avg_queries': round(sum(v[1] for v in values) / n, 1),
+                'avg_db_ms': round(sum(v[2] for v in values) / n, 2),
+                'avg_render_ms': round(sum(v[3] for v in values) / n, 2),
+            })
+        return {'endpoints': rows, 'slowest': slowest}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._slowest.clear()
+
+
+stats = RequestStats()
+
+
+def _current():
+    if has_request_context():
+        return g.get('_perf')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_perf_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_perf_start'].pop()
+    perf = _current()
+    if perf is None:
+        return
+    elapsed = (time.perf_counter() - started) * 1000
+    perf['queries'] += 1
+    perf['db_ms'] += elapsed
+    perf['statements'].append((elapsed, statement))
+    if elapsed >= perf['slow_ms']:
+        stats.record_slow(request.endpoint, statement, elapsed)
+        logger.warning('slow query %.1fms on %s: %s', elapsed, request.endpoint, ' '.join(statement.split())[:500])
+
+
+def _before_render(sender, template, context, **extra):
+    perf = _current()
+    if perf is not None:
+        perf['render_started'].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    perf = _current()
+    if perf is not None and perf['render_started']:
+        perf['render_ms'] += (time.perf_counter() - perf['render_started'].pop()) * 1000
+
+
+def init_app(app):
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return False
+    if app.extensions.get('instrumentation'):
+        return True
+    app.extensions['instrumentation'] = stats
+    slow_ms = app.config.get('SLOW_QUERY_MS', 100)
+    top_n = app.config.get('INSTRUMENTATION_TOP_STATEMENTS', 3)
+    stats.window = app.config.get('INSTRUMENTATION_WINDOW', 1000)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def start_request_timer():
+        g._perf = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_ms': 0.0,
+            'render_ms': 0.0,
+            'render_started': [],
+            'statements': [],
+            'slow_ms': slow_ms,
+        }
+
+    @app.after_request
+    def emit_request_timing(response):
+        perf = g.pop('_perf', None)
+        if perf is None:
+            return response
+        total_ms = (time.perf_counter() - perf['started']) * 1000
+        endpoint = request.endpoint or 'unmatched'
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={perf["db_ms"]:.2f};desc="{perf["queries"]} queries", '
+            f'tpl;dur={perf["render_ms"]:.2f}, app;dur={total_ms:.2f}'
+        )
+        if endpoint != 'static':
+            stats.record(endpoint, total_ms, perf['queries'], perf['db_ms'], perf['render_ms'])
+        slowest = sorted(perf['statements'], key=lambda s: s[0], reverse=True)[:top_n]
+        logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'queries': perf['queries'],
+            'db_ms': round(perf['db_ms'], 2),
+            'render_ms': round(perf['render_ms'], 2),
+            'slowest': [{'ms': round(ms, 2), 'sql': ' '.join(sql.split())[:200]} for ms, sql in slowest],
+        }))
+        return response
+
+    return True
@@ -1,40 +1,80 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Person(db.Model):
+    __table_args__ = (db.Index('ix_person_name', 'last_name', 'first_name'),)
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    department = db.Column(db.String(100), nullable=False)
+    department = db.Column(db.String(100), nullable=False, index=True)
     items = db.relationship('InventoryItem', backref='person', lazy=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 class InventoryItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    item_type = db.Column(db.String(100), nullable=False)
+    item_type = db.Column(db.String(100), nullable=False, index=True)
     serial_number = db.Column(db.String(100), unique=True, nullable=False)
     details = db.Column(db.String(255))
-    status = db.Column(db.String(50), nullable=False)
-    assigned_to_id = db.Column(db.Integer, db.ForeignKey('person.id'))
+    status = db.Column(db.String(50), nullable=False, index=True)
+    assigned_to_id = db.Column(db.Integer, db.ForeignKey('person.id'), index=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
-    role = db.Column(db.String(20), nullable=False, default='admin')  # Added role column: 'admin' or 'read_only'
+    role = db.Column(db.String(20), nullable=False, default='admin', index=True)  # Added role column: 'admin' or 'read_only'
+    # Bumped whenever password or role changes (see user_cache.py); part of the
+    # session id so cached logins and old sessions are invalidated
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    def get_id(self):
+        return f'{self.id}:{self.version or 1}'
 
 class AuditLog(db.Model):
+    __table_args__ = (
+        db.Index('ix_audit_log_timestamp', 'timestamp'),
+        db.Index('ix_audit_log_model', 'model_type', 'model_id'),
+        db.Index('ix_audit_log_user', 'user_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     action = db.Column(db.String(100), nullable=False)
     model_type = db.Column(db.String(50), nullable=False)
     model_id = db.Column(db.Integer, nullable=False)
-    user_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    details = db.Column(db.String(255))
\ No newline at end of file
+    details = db.Column(db.String(255))
+    user = db.relationship('User')
+
+class StatCounter(db.Model):
+    # Maintained by SQL triggers (see counters.py); scope is e.g. 'items_status'
+    # and key the status value, with key '' for plain totals.
+    scope = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class ItemAssignment(db.Model):
+    # Who held an item and when. Written by triggers on inventory_item (see
+    # history.py); ended_at is NULL for the current holder. No foreign keys so
+    # the history outlives deleted items and people; serial_number is copied
+    # from the item so deleted items can still be looked up by it.
+    __table_args__ = (
+        db.Index('ix_item_assignment_item', 'item_id', 'started_at'),
+        db.Index('ix_item_assignment_person', 'person_id', 'started_at'),
+        db.Index('ix_item_assignment_serial', 'serial_number', 'started_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False)
+    serial_number = db.Column(db.String(100))
+    person_id = db.Column(db.Integer, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    ended_at = db.Column(db.DateTime)
+    item = db.relationship('InventoryItem', primaryjoin='foreign(ItemAssignment.item_id) == InventoryItem.id', viewonly=True)
+    person = db.relationship('Person', primaryjoin='foreign(ItemAssignment.person_id) == Person.id', viewonly=True)
@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+from cache import TTLCache, table_version
+
+_count_cache = TTLCache(maxsize=512)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    # Anything else would reach the database as a bound parameter; SQLite rejects lists and dicts
+    if value is not None and not isinstance(value, (str, int, float)):
+        raise TypeError(f'unsupported cursor value: {type(value).__name__}')
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':')).encode('utf8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list):
+            return None
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        return None
+
+
+def cached_count(query, key, tables):
+    ttl = current_app.config.get('COUNT_CACHE_TTL', 60)
+    cache_key = (key, table_version(*tables))
+    return _count_cache.get_or_set(cache_key, lambda: query.order_by(None).count(), ttl=ttl)
+
+
+class Page:
+    def __init__(self, items, total, per_page, sort, direction, next_cursor, prev_cursor, args):
+        self.items = items
+        self.total = total
+        self.per_page = per_page
+        self.sort = sort
+        self.direction = direction
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        # Query args that must survive navigation (search, sort, page size).
+        self.args = args
+
+    def sort_args(self, column):
+        args = {k: v for k, v in self.args.items() if k not in ('sort', 'dir')}
+        args['sort'] = column
+        args['dir'] = 'desc' if self.sort == column and self.direction == 'asc' else 'asc'
+        return args
+
+
+def paginate(query, sortable, default_sort, id_column, count_key, count_tables, extra_args=None, default_direction='asc'):
+    """Keyset-paginate ``query`` using the sort/dir/after/before/per_page request args.
+
+    ``sortable`` maps a sort name to a tuple of column expressions; rows are
+    ordered by those expressions plus ``id_column`` so the cursor is unique.
+    Pass ``count_key=None`` to skip the total count on very large tables.
+    """
+    sort = request.args.get('sort', default_sort)
+    if sort not in sortable:
+        sort = default_sort
+    direction = request.args.get('dir', default_direction)
+    if direction not in ('asc', 'desc'):
+        direction = default_direction
+    max_per_page = current_app.config.get('MAX_PAGE_SIZE', 200)
+    per_page = request.args.get('per_page', current_app.config.get('PAGE_SIZE', 50), type=int)
+    per_page = max(1, min(per_page or 1, max_per_page))
+
+    total = cached_count(query, count_key, count_tables) if count_key is not None else None
+
+    keys = tuple(sortable[sort]) + (id_column,)
+    after = decode_cursor(request.args.get('after', ''))
+    before = decode_cursor(request.args.get('before', '')) if not after else None
+    cursor = after or before
+    if cursor is not None and len(cursor) != len(keys):
+        cursor = before = None
+    # Walking backwards flips the ordering; rows are reversed again below.
+    descending = (direction == 'desc') != (before is not None)
+
+    if cursor is not None:
+        if descending:
+            query = query.filter(tuple_(*keys) < tuple_(*cursor))
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*cursor))
+    order = [k.desc() if descending else k.asc() for k in keys]
+    rows = query.add_columns(*keys).order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before is not None:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    n = len(keys)
+    items = [row[0] for row in rows]
+    next_cursor = encode_cursor(rows[-1][-n:]) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0][-n:]) if rows and has_prev else None
+
+    args = {'sort': sort, 'dir': direction}
+    if 'per_page' in request.args:
+        args['per_page'] = per_page
+    args.update({k: v for k, v in (extra_args or {}).items() if v})
+    return Page(items, total, per_page, sort, direction, next_cursor, prev_cursor, args)
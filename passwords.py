@@ -0,0 +1,152 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy.orm import object_session
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from per_process import PerProcess
+
+# Password hashing policy and a bounded pool to run it on.
+#
+# PASSWORD_HASH_METHOD is any method werkzeug understands, with or without
+# explicit parameters ('scrypt', 'scrypt:32768:8:1', 'pbkdf2:sha256:600000').
+# Stored hashes made with a different method or cost are upgraded the next
+# time their owner logs in.
+#
+# hashlib releases the GIL while running scrypt and PBKDF2, so a small thread
+# pool keeps the work off the request threads without needing processes. At
+# most PASSWORD_HASH_WORKERS hashes run at once and PASSWORD_HASH_QUEUE more
+# may wait; beyond that callers get HashingBusy instead of piling up and
+# starving ordinary page requests of CPU.
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing pool and its queue are full."""
+
+
+@lru_cache(maxsize=None)
+def method_signature(method):
+    # werkzeug fills in default parameters, so 'scrypt' is stored as
+    # 'scrypt:32768:8:1'; hash once to learn the exact prefix it will write
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+def needs_rehash(pwhash, method):
+    return pwhash.split('$', 1)[0] != method_signature(method)
+
+
+class HashPool:
+    def __init__(self, method, workers=2, queue_size=16, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor = PerProcess(
+            lambda: ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash'))
+        self._metrics_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.max_ms = 0.0
+        self._total_ms = 0.0
+
+    def _timed(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._metrics_lock:
+                self.completed += 1
+                self.max_ms = max(self.max_ms, elapsed)
+                self._total_ms += elapsed
+
+    def _release(self, future):
+        with self._metrics_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._metrics_lock:
+                self.rejected += 1
+            raise HashingBusy('Too many password operations in progress')
+        with self._metrics_lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.get().submit(self._timed, fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise HashingBusy('Timed out waiting for a password operation')
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, method=self.method)
+
+    def check(self, pwhash, password):
+        return self.run(check_password_hash, pwhash, password)
+
+    def shutdown(self):
+        executor = self._executor.current()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'method': method_signature(self.method),
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'max_ms': round(self.max_ms, 2),
+                'avg_ms': round(self._total_ms / self.completed, 2) if self.completed else 0.0,
+            }
+
+
+def get_pool(app=None):
+    app = app or current_app
+    pool = app.extensions.get('password_hasher')
+    if pool is None:
+        pool = HashPool(
+            app.config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+            workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+            queue_size=app.config.get('PASSWORD_HASH_QUEUE', 16),
+            timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+        )
+        pool = app.extensions.setdefault('password_hasher', pool)
+    return pool
+
+
+def hash_password(password):
+    return get_pool().hash(password)
+
+
+def check_password(pwhash, password):
+    return get_pool().check(pwhash, password)
+
+
+def verify_password(user, password):
+    """Check ``password`` against ``user``; on success upgrade an outdated hash.
+
+    The upgraded hash is left on the session for the caller to commit. Because
+    the password itself hasn't changed, the user's existing sessions stay valid.
+    """
+    pool = get_pool()
+    if not pool.check(user.password, password):
+        return False
+    if needs_rehash(user.password, pool.method):
+        user.password = pool.hash(password)
+        # Read by user_cache so a rehash doesn't bump the user's session version
+        session = object_session(user)
+        if session is not None:
+            session.info.setdefault('rehashed_users', set()).add(user.id)
+    return True
+
@@ -0,0 +1,38 @@
+import os
+import threading
+
+# Threads don't survive fork, and gunicorn (with preload_app) forks its
+# workers after the app has been imported. Anything that owns threads, like
+# the audit writer and the password hashing pool, is therefore created lazily
+# on first use and re-created in each new process.
+
+
+class PerProcess:
+    """A value built by ``factory`` on first use in each process.
+
+    If ``alive`` is given it is checked on every get(), and a value it rejects
+    (a thread that has exited, say) is built again.
+    """
+
+    def __init__(self, factory, alive=None):
+        self._factory = factory
+        self._alive = alive
+        self._value = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _usable(self):
+        return (self._value is not None and self._pid == os.getpid()
+                and (self._alive is None or self._alive(self._value)))
+
+    def get(self):
+        if not self._usable():
+            with self._lock:
+                if not self._usable():
+                    self._value = self._factory()
+                    self._pid = os.getpid()
+        return self._value
+
+    def current(self):
+        """The value if this process has built one, else None."""
+        return self._value if self._pid == os.getpid() else None
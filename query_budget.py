@@ -0,0 +1,139 @@
+"""Check that each page issues no more SQL statements than its budget.
+
+Builds a throwaway database with enough rows that an N+1 pattern would blow
+well past the budget, requests every page through the Flask test client and
+exits non-zero if any route goes over.
+
+    python query_budget.py
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+TODAY = datetime.utcnow().strftime('%Y-%m-%d')
+
+# Budgets are per request and include the Flask-Login user lookup.
+BUDGETS = {
+    '/': 4,
+    '/employees': 5,
+    '/employees?search=Person': 5,
+    '/assets': 4,
+    '/assets?search=Laptop': 4,
+    '/assets?sort=assigned_to&dir=desc': 4,
+    '/employees/results?search=Person': 5,
+    '/assets/results?search=Laptop': 4,
+    '/users': 4,
+    '/person/1': 4,
+    '/add-item': 4,
+    '/edit-item/1': 4,
+    '/api/people?q=Person1': 3,
+    '/person/1/history': 3,
+    f'/person/1/history?at={TODAY}': 4,
+    '/item/1/history': 3,
+    f'/item/1/history?at={TODAY}': 4,
+    '/history?serial_number=SN000001': 2,
+}
+
+# Routes that answer with a redirect rather than a page
+REDIRECTS = {'/history?serial_number=SN000001'}
+
+USERS = 10
+PEOPLE = 200
+ITEMS = 500
+AUDIT_ROWS = 50
+
+
+def seed(db, models):
+    from werkzeug.security import generate_password_hash
+    Person, InventoryItem, User, AuditLog = models
+    now = datetime.utcnow()
+    password = generate_password_hash('admin')
+    db.session.add(User(username='admin', password=password, role='admin'))
+    db.session.add_all(User(username=f'user{i}', password=password, role='read_only') for i in range(USERS))
+    db.session.add_all(
+        Person(first_name=f'Person{i}', last_name=f'Budget{i % 17}', email=f'person{i}@example.com',
+               department=f'Dept{i % 7}', created_at=now, updated_at=now)
+        for i in range(1, PEOPLE + 1)
+    )
+    db.session.flush()
+    db.session.add_all(
+        InventoryItem(item_type=('Laptop', 'Monitor', 'Phone')[i % 3], serial_number=f'SN{i:06d}',
+                      details=f'Item {i}', status='active' if i % 4 else 'stock',
+                      assigned_to_id=(i % PEOPLE) + 1 if i % 4 else None, created_at=now, updated_at=now)
+        for i in range(1, ITEMS + 1)
+    )
+    db.session.add_all(
+        AuditLog(action='update', model_type='InventoryItem', model_id=i, user_id=(i % (USERS + 1)) + 1,
+                 details=f'Audit row {i}', timestamp=now)
+        for i in range(1, AUDIT_ROWS + 1)
+    )
+    db.session.commit()
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='query-budget-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'budget.sqlite3')}"
+
+    from app import create_app
+    from models import db, Person, InventoryItem, User, AuditLog
+    from search import install_index, rebuild_index
+    import counters
+    import history
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        install_index(db.engine)
+        counters.install_triggers(db.engine)
+        history.install_triggers(db.engine)
+        seed(db, (Person, InventoryItem, User, AuditLog))
+        rebuild_index(db.engine)
+        engine = db.engine
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin'})
+
+    failures = 0
+    for path, budget in BUDGETS.items():
+        # Take the worse of a cold and a warm request so caches can't hide regressions
+        counts = []
+        for _ in range(2):
+            with count_statements(engine) as statements:
+                response = client.get(path)
+            if response.status_code != (302 if path in REDIRECTS else 200):
+                print(f'FAIL {path}: HTTP {response.status_code}')
+                failures += 1
+                break
+            counts.append(len(statements))
+        else:
+            used = max(counts)
+            status = 'ok  ' if used <= budget else 'FAIL'
+            print(f'{status} {path}: {used} statements (budget {budget})')
+            if used > budget:
+                failures += 1
+                for statement in statements:
+                    print('       ' + ' '.join(statement.split())[:160])
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
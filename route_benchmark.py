@@ -0,0 +1,447 @@
+"""Drive every route through the Flask test client and record how it performs.
+
+For each scenario this reports latency percentiles, SQL statements per
+request and the peak Python memory allocated while serving one request
+(measured in a separate traced pass so tracing doesn't skew the timings),
+and writes everything to a JSON file. Pass a previous file with --compare
+to flag routes that got slower or chattier; the exit status is 1 if any did.
+
+Every request's outcome is checked as well (writes must redirect with a
+success message and leave the expected rows behind). A scenario that fails
+is reported as FAILED instead of timed, and also makes the exit status 1.
+
+    python route_benchmark.py                                   # small throwaway dataset
+    python route_benchmark.py --people 100000 --items 1000000 --audit 10000000
+    python route_benchmark.py --database sqlite:////data/big.sqlite3 --iterations 50
+    python route_benchmark.py --output after.json --compare before.json
+
+The write scenarios edit, create and delete rows, so point --database at a
+copy, never at the live file.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from sqlalchemy import event
+
+PASSWORD = 'benchmark'
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class Context:
+    """Ids and counters the scenarios draw on; created rows are remembered for cleanup scenarios."""
+
+    def __init__(self, rng, person_ids, item_ids, user_ids):
+        self.rng = rng
+        self.person_ids = person_ids
+        self.item_ids = item_ids
+        self.user_ids = user_ids
+        self.created_items = []
+        self.created_people = []
+        self.sequence = 0
+
+    def next(self):
+        self.sequence += 1
+        return f'{os.getpid()}-{self.sequence}'
+
+
+def _item_form(item, details):
+    return {
+        'item_type': item.item_type,
+        'serial_number': item.serial_number,
+        'details': details,
+        'assigned_to': item.assigned_to_id or '',
+        **({} if item.assigned_to_id else {'is_stock': 'on'}),
+    }
+
+
+def _import_csv(last_name, rows):
+    buffer = io.StringIO()
+    buffer.write('first_name,last_name,department,email\n')
+    for n in range(rows):
+        buffer.write(f'Bench{n},{last_name},Benchmark,bench.{last_name}.{n}@example.com\n')
+    return {'kind': 'people', 'csv_file': (io.BytesIO(buffer.getvalue().encode()), 'people.csv')}
+
+
+def _succeeded(response, flashes):
+    """Problem with a form post's outcome, or None: it must redirect with only a success flash."""
+    if response.status_code != 302:
+        return f'HTTP {response.status_code}'
+    errors = [message for category, message in flashes if category != 'success']
+    if errors or not flashes:
+        return '; '.join(errors) or 'no success message'
+    return None
+
+
+def scenarios(ctx):
+    """(name, callable returning (method, path, request kwargs[, check])) for every route.
+
+    ``check(response, flashes)`` runs after the request, outside the timing, and
+    returns a description of what went wrong or None; writes use it to confirm
+    their effect. Without one, any 4xx or 5xx response fails the scenario.
+    """
+    from models import db, InventoryItem, Person, User
+
+    def item():
+        return db.session.get(InventoryItem, ctx.rng.choice(ctx.item_ids))
+
+    def person():
+        return db.session.get(Person, ctx.rng.choice(ctx.person_ids))
+
+    def expect(exists, model, **filters):
+        """Check that the post succeeded and a matching row now exists (or no longer does)."""
+        def check(response, flashes):
+            problem = _succeeded(response, flashes)
+            if problem is None and (db.session.query(model.id).filter_by(**filters).first() is not None) != exists:
+                problem = f"{model.__name__} {filters} {'missing' if exists else 'still present'}"
+            return problem
+        return check
+
+    def add_item():
+        serial = f'BENCH-{ctx.next()}'
+        ctx.created_items.append(serial)
+        return 'POST', '/add-item', {'data': {'item_type': 'Laptop', 'serial_number': serial,
+                                              'details': 'benchmark', 'is_stock': 'on'}}, \
+            expect(True, InventoryItem, serial_number=serial)
+
+    def delete_item():
+        created = ctx.created_items.pop() if ctx.created_items else None
+        row = InventoryItem.query.filter_by(serial_number=created).first() if created else None
+        return 'POST', f'/delete-item/{row.id if row else 0}', {}, expect(False, InventoryItem, serial_number=created)
+
+    def add_person():
+        email = f'bench.{ctx.next()}@example.com'
+        ctx.created_people.append(email)
+        return 'POST', '/add-person', {'data': {'first_name': 'Bench', 'last_name': 'Person',
+                                                'email': email, 'department': 'Benchmark'}}, \
+            expect(True, Person, email=email)
+
+    def delete_person():
+        email = ctx.created_people.pop() if ctx.created_people else None
+        row = Person.query.filter_by(email=email).first() if email else None
+        return 'POST', f'/delete-person/{row.id if row else 0}', {}, expect(False, Person, email=email)
+
+    def edit_item():
+        row = item()
+        details = f'benchmark {ctx.rng.random():.6f}'
+        return 'POST', f'/edit-item/{row.id}', {'data': _item_form(row, details)}, \
+            expect(True, InventoryItem, id=row.id, details=details)
+
+    def edit_person():
+        row = person()
+        return 'POST', f'/edit-person/{row.id}', {'data': {
+            'first_name': row.first_name, 'last_name': row.last_name, 'email': row.email, 'department': row.department,
+        }}, _succeeded
+
+    def bulk_status():
+        serials = [i.serial_number for i in InventoryItem.query.filter(InventoryItem.id.in_(
+            ctx.rng.sample(ctx.item_ids, min(50, len(ctx.item_ids)))))]
+
+        def check(response, flashes):
+            # Unassigned items can't become active, so some per-item errors are expected
+            if response.status_code != 200 or not response.get_json().get('applied'):
+                return f'HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}'
+            return None
+
+        return 'POST', '/api/items/bulk', {'json': {'operation': 'status', 'serials': serials,
+                                                    'status': ctx.rng.choice(['repair', 'active'])}}, check
+
+    def add_user():
+        username = f'bench-{ctx.next()}'
+        return 'POST', '/add-user', {'data': {'username': username, 'password': PASSWORD,
+                                              'role': 'read_only'}}, expect(True, User, username=username)
+
+    def change_user_password():
+        return 'POST', f'/change-user-password/{ctx.rng.choice(ctx.user_ids)}', {
+            'data': {'new_password': PASSWORD, 'confirm_password': PASSWORD}}, _succeeded
+
+    def import_people(rows=200):
+        last_name = f'Import{ctx.next()}'
+
+        def check(response, flashes):
+            problem = _succeeded(response, flashes)
+            imported = Person.query.filter_by(last_name=last_name).count()
+            if problem is None and imported != rows:
+                problem = f'{imported} of {rows} people imported'
+            return problem
+
+        return 'POST', '/import-csv', {'data': _import_csv(last_name, rows),
+                                       'content_type': 'multipart/form-data'}, check
+
+    def logged_in(response, flashes):
+        if response.status_code != 302 or urlsplit(response.location).path != '/':
+            return f'HTTP {response.status_code} to {response.location}'
+        return None
+
+    def get(path):
+        return lambda: ('GET', path() if callable(path) else path, {})
+
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+
+    return [
+        ('dashboard', get('/')),
+        ('employees', get('/employees')),
+        ('employees sorted', get('/employees?sort=department&dir=desc')),
+        ('employees search', get(lambda: f"/employees?search={ctx.rng.choice(['smith', 'pat', 'engineering'])}")),
+        ('assets', get('/assets')),
+        ('assets sorted', get('/assets?sort=assigned_to&dir=desc')),
+        ('assets search', get(lambda: f"/assets?search={ctx.rng.choice(['laptop', 'monitor 27', 'chen'])}")),
+        ('employees live search', get(lambda: f"/employees/results?search={ctx.rng.choice(['smith', 'pat', 'engineering'])}")),
+        ('assets live search', get(lambda: f"/assets/results?search={ctx.rng.choice(['laptop', 'monitor 27', 'chen'])}")),
+        ('users', get('/users')),
+        ('person detail', get(lambda: f'/person/{ctx.rng.choice(ctx.person_ids)}')),
+        ('person history', get(lambda: f'/person/{ctx.rng.choice(ctx.person_ids)}/history')),
+        ('person history as of', get(lambda: f'/person/{ctx.rng.choice(ctx.person_ids)}/history?at={today}')),
+        ('item history', get(lambda: f'/item/{ctx.rng.choice(ctx.item_ids)}/history')),
+        ('item history as of', get(lambda: f'/item/{ctx.rng.choice(ctx.item_ids)}/history?at={today}')),
+        ('item history by serial', get(lambda: f'/history?serial_number={item().serial_number}')),
+        ('people lookup', get(lambda: f"/api/people?q={ctx.rng.choice(['sm', 'pri', 'garcia'])}")),
+        ('audit log', get('/audit')),
+        ('audit log filtered', get('/audit?action=delete&model_type=InventoryItem')),
+        ('performance stats', get('/admin/stats')),
+        ('health', get('/healthz')),
+        ('readiness', get('/readyz')),
+        ('add item form', get('/add-item')),
+        ('edit item form', get(lambda: f'/edit-item/{ctx.rng.choice(ctx.item_ids)}')),
+        ('add person form', get('/add-person')),
+        ('edit person form', get(lambda: f'/edit-person/{ctx.rng.choice(ctx.person_ids)}')),
+        ('add user form', get('/add-user')),
+        ('change password form', get('/change-password')),
+        ('change user password form', get(lambda: f'/change-user-password/{ctx.rng.choice(ctx.user_ids)}')),
+        ('import form', get('/import-csv')),
+        ('export form', get('/export')),
+        ('add item', add_item),
+        ('delete item', delete_item),
+        ('add person', add_person),
+        ('delete person', delete_person),
+        ('edit item', edit_item),
+        ('edit person', edit_person),
+        ('bulk status', bulk_status),
+        ('add user', add_user),
+        ('change user password', change_user_password),
+        ('import people csv', import_people),
+        ('export people csv', get('/export/people?format=csv')),
+        ('export items ndjson', get('/export/items?format=ndjson')),
+        ('export audit csv', get('/export/audit?format=csv&date_from=' + datetime.utcnow().strftime('%Y-%m-01'))),
+        ('export csv (legacy)', get('/export-csv')),
+        ('login', lambda: ('POST', '/login', {'data': {'username': 'bench-admin', 'password': PASSWORD}}, logged_in)),
+        ('logout', get('/logout')),
+    ]
+
+
+def _flashes(client):
+    """Take the messages flashed by the last request, as a redirect target would."""
+    with client.session_transaction() as session:
+        return session.pop('_flashes', [])
+
+
+def _login(client):
+    response = client.post('/login', data={'username': 'bench-admin', 'password': PASSWORD})
+    if response.status_code != 302:
+        raise SystemExit('Could not log in as bench-admin')
+
+
+def run(app, iterations, warmup, only=None, random_seed=1):
+    from models import db, AuditLog, InventoryItem, Person, User
+    from passwords import hash_password
+
+    with app.app_context():
+        for username, role in (('bench-admin', 'admin'), ('bench-user', 'read_only')):
+            if User.query.filter_by(username=username).first() is None:
+                db.session.add(User(username=username, password=hash_password(PASSWORD), role=role))
+        db.session.commit()
+        rng = random.Random(random_seed)
+        # Sample ids up front so scenarios don't scan the tables on every request
+        person_ids = [i for (i,) in db.session.query(Person.id).order_by(db.func.random()).limit(1000)]
+        item_ids = [i for (i,) in db.session.query(InventoryItem.id).order_by(db.func.random()).limit(1000)]
+        # Password changes only ever target the benchmark's own user
+        user_ids = [User.query.filter_by(username='bench-user').first().id]
+        if not (person_ids and item_ids):
+            raise SystemExit('The database needs people, items and users; run seed_data.py first')
+        counts = {
+            'person': Person.query.count(),
+            'inventory_item': InventoryItem.query.count(),
+            'user': User.query.count(),
+            'audit_log': AuditLog.query.count(),
+        }
+        engines = list(db.engines.values())
+
+    statements = []
+    request_thread = threading.get_ident()
+
+    def count_statement(*args):
+        # The audit writer's batches run on its own thread and aren't part of the request
+        if threading.get_ident() == request_thread:
+            statements.append(1)
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', count_statement)
+
+    ctx = Context(rng, person_ids, item_ids, user_ids)
+    client = app.test_client()
+    _login(client)
+    results = []
+    for name, build in scenarios(ctx):
+        if only and name not in only:
+            continue
+        timings, sql_counts, sizes, statuses = [], [], [], set()
+        peak_kb = 0.0
+        failure = None
+        for n in range(warmup + iterations + 1):
+            with app.app_context():
+                method, path, kwargs, *check = build()
+            traced = n == warmup + iterations
+            if traced:
+                tracemalloc.start()
+            del statements[:]
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            body = response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            if traced:
+                peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+            elif n >= warmup:
+                timings.append(elapsed)
+                sql_counts.append(len(statements))
+                sizes.append(len(body))
+                statuses.add(response.status_code)
+            flashes = _flashes(client)
+            with app.app_context():
+                if check:
+                    failure = check[0](response, flashes)
+                elif response.status_code >= 400:
+                    failure = f'HTTP {response.status_code}'
+            if name in ('login', 'logout'):
+                _login(client)
+            if failure:
+                break
+        if failure:
+            # Timings of requests that didn't do their job would only mislead
+            results.append({'route': name, 'method': method, 'failed': f'{method} {path}: {failure}'})
+            print(f"{name:<28} FAILED {results[-1]['failed']}", flush=True)
+            continue
+        results.append({
+            'route': name,
+            'method': method,
+            'iterations': iterations,
+            'status': sorted(statuses),
+            'p50_ms': round(_percentile(timings, 0.5), 2),
+            'p90_ms': round(_percentile(timings, 0.9), 2),
+            'p95_ms': round(_percentile(timings, 0.95), 2),
+            'p99_ms': round(_percentile(timings, 0.99), 2),
+            'max_ms': round(max(timings), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+            'sql_mean': round(sum(sql_counts) / len(sql_counts), 1),
+            'sql_max': max(sql_counts),
+            'peak_kb': round(peak_kb, 1),
+            'bytes': int(sum(sizes) / len(sizes)),
+        })
+        row = results[-1]
+        print(f"{name:<28} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['sql_mean']:>6} {row['sql_max']:>5} {row['peak_kb']:>9.0f} {','.join(map(str, row['status']))}",
+              flush=True)
+    return counts, results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {row['route']: row for row in json.load(f)['results']}
+    regressions = []
+    print(f"\nCompared with {baseline_path} (threshold {threshold:.0%}):")
+    for row in results:
+        before = baseline.get(row['route'])
+        if before is None or 'failed' in before or 'failed' in row:
+            continue
+        slower = before['p95_ms'] and row['p95_ms'] > before['p95_ms'] * (1 + threshold) and row['p95_ms'] - before['p95_ms'] > 1
+        chattier = row['sql_max'] > before['sql_max']
+        if slower or chattier:
+            regressions.append(row['route'])
+            print(f"  REGRESSED {row['route']}: p95 {before['p95_ms']} -> {row['p95_ms']} ms, "
+                  f"sql max {before['sql_max']} -> {row['sql_max']}")
+    if not regressions:
+        print('  no regressions')
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='existing database URL to benchmark (default: a new seeded one)')
+    parser.add_argument('--people', type=int, default=2000, help='rows to seed into a new database')
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--audit', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--route', action='append', help='only run these scenarios (repeatable)')
+    parser.add_argument('--output', default='route_benchmark.json')
+    parser.add_argument('--compare', help='previous results file to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p95 slowdown before flagging')
+    args = parser.parse_args(argv)
+
+    seeded = None
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix='route-benchmark-'), 'benchmark.sqlite3')
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+        seeded = {'people': args.people, 'items': args.items, 'audit': args.audit}
+
+    from app import create_app
+    from seed_data import seed
+
+    app = create_app()
+    if seeded:
+        seed(app, people=args.people, items=args.items, users=20, audit=args.audit)
+
+    print(f"\n{'route':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql':>6} {'max':>5} {'peak KB':>9} status")
+    counts, results = run(app, args.iterations, args.warmup, set(args.route) if args.route else None)
+
+    report = {
+        'created': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'seeded': seeded,
+        'rows': counts,
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nResults written to {args.output}')
+
+    failed = [row['route'] for row in results if 'failed' in row]
+    if failed:
+        print(f"\nFailed: {', '.join(failed)}")
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) or failed else 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+import re
+
+from flask import current_app
+from sqlalchemy import text
+
+from models import db, Person, InventoryItem
+
+# Full-text search over people and inventory items, backed by SQLite FTS5.
+# The FTS tables keep their own copy of the searchable columns and are kept in
+# sync by triggers, so every write path (ORM, bulk SQL, sqlite3 shell) is covered.
+# Item rows also index the assignee's name so "laptop smith" matches in one lookup.
+
+PERSON_COLUMNS = ('first_name', 'last_name', 'email', 'department')
+ITEM_COLUMNS = ('item_type', 'serial_number', 'details', 'assignee')
+
+# bm25 column weights, in the column order above
+PERSON_WEIGHTS = (4.0, 4.0, 2.0, 1.0)
+ITEM_WEIGHTS = (2.0, 4.0, 1.0, 2.0)
+
+_ITEM_ROW = """
+    SELECT i.id, i.item_type, i.serial_number, coalesce(i.details, ''),
+           coalesce(p.first_name || ' ' || p.last_name, '')
+    FROM inventory_item i LEFT JOIN person p ON p.id = i.assigned_to_id
+"""
+
+TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS person_fts_ai AFTER INSERT ON person BEGIN
+        INSERT INTO person_fts(rowid, first_name, last_name, email, department)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.department);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS person_fts_ad AFTER DELETE ON person BEGIN
+        DELETE FROM person_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS person_fts_au
+    AFTER UPDATE OF first_name, last_name, email, department ON person BEGIN
+        DELETE FROM person_fts WHERE rowid = old.id;
+        INSERT INTO person_fts(rowid, first_name, last_name, email, department)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.department);
+        UPDATE item_fts SET assignee = new.first_name || ' ' || new.last_name
+        WHERE rowid IN (SELECT id FROM inventory_item WHERE assigned_to_id = new.id)
+          AND (old.first_name IS NOT new.first_name OR old.last_name IS NOT new.last_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS item_fts_ai AFTER INSERT ON inventory_item BEGIN
+        INSERT INTO item_fts(rowid, item_type, serial_number, details, assignee)""" + _ITEM_ROW + """
+        WHERE i.id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS item_fts_ad AFTER DELETE ON inventory_item BEGIN
+        DELETE FROM item_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS item_fts_au
+    AFTER UPDATE OF item_type, serial_number, details, assigned_to_id ON inventory_item BEGIN
+        DELETE FROM item_fts WHERE rowid = old.id;
+        INSERT INTO item_fts(rowid, item_type, serial_number, details, assignee)""" + _ITEM_ROW + """
+        WHERE i.id = new.id;
+    END""",
+]
+
+# Tokenizer each FTS table was built with, per database URL; None when the
+# tables are missing and search falls back to ILIKE.
+_installed = {}
+
+
+def _tokenize_clause(tokenizer):
+    if tokenizer == 'trigram':
+        return "tokenize='trigram'"
+    return f"tokenize='{tokenizer}', prefix='2 3'"
+
+
+def install_index(engine, tokenizer=None):
+    """Create the FTS tables and sync triggers if missing; returns True if created."""
+    tokenizer = tokenizer or current_app.config.get('SEARCH_TOKENIZER', 'trigram')
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'person_fts'"
+        )).first()
+        if not exists:
+            options = _tokenize_clause(tokenizer)
+            conn.execute(text(f"CREATE VIRTUAL TABLE person_fts USING fts5({', '.join(PERSON_COLUMNS)}, {options})"))
+            conn.execute(text(f"CREATE VIRTUAL TABLE item_fts USING fts5({', '.join(ITEM_COLUMNS)}, {options})"))
+        for trigger in TRIGGERS:
+            conn.execute(text(trigger))
+    _installed.pop(str(engine.url), None)
+    return not exists
+
+
+def rebuild_index(engine):
+    """Repopulate both FTS tables from scratch and merge their b-trees."""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM person_fts"))
+        conn.execute(text(
+            "INSERT INTO person_fts(rowid, first_name, last_name, email, department) "
+            "SELECT id, first_name, last_name, email, department FROM person"
+        ))
+        conn.execute(text("DELETE FROM item_fts"))
+        conn.execute(text(
+            "INSERT INTO item_fts(rowid, item_type, serial_number, details, assignee)" + _ITEM_ROW
+        ))
+        conn.execute(text("INSERT INTO person_fts(person_fts) VALUES ('optimize')"))
+        conn.execute(text("INSERT INTO item_fts(item_fts) VALUES ('optimize')"))
+        people = conn.execute(text("SELECT count(*) FROM person_fts")).scalar()
+        items = conn.execute(text("SELECT count(*) FROM item_fts")).scalar()
+    return people, items
+
+
+def installed_tokenizer():
+    key = str(db.engine.url)
+    if key not in _installed:
+        sql = db.session.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'item_fts'"
+        )).scalar()
+        if sql is None:
+            _installed[key] = None
+        else:
+            match = re.search(r"tokenize\s*=\s*'(\w+)", sql)
+            _installed[key] = match.group(1) if match else 'unicode61'
+    return _installed[key]
+
+
+def parse_terms(search_text):
+    return [term for term in re.split(r'\s+', search_text.strip()) if term]
+
+
+def fts_query(terms, tokenizer):
+    # Every term is quoted so user input can't inject FTS5 operators; adjacent
+    # phrases are implicitly AND-ed. Trigram phrases already match substrings,
+    # word tokenizers get prefix matching instead.
+    phrases = ['"' + term.replace('"', '""') + '"' for term in terms]
+    if tokenizer != 'trigram':
+        phrases = [phrase + '*' for phrase in phrases]
+    return ' '.join(phrases)
+
+
+def _fts_usable(terms):
+    tokenizer = installed_tokenizer()
+    if tokenizer is None:
+        return None
+    # The trigram tokenizer cannot match terms shorter than three characters
+    if tokenizer == 'trigram' and any(len(term) < 3 for term in terms):
+        return None
+    return tokenizer
+
+
+def _match_subquery(table, weights, name, match):
+    weight_args = ', '.join(str(w) for w in weights)
+    return text(
+        f"SELECT rowid AS id, bm25({table}, {weight_args}) AS score "
+        f"FROM {table} WHERE {table} MATCH :{name}_match"
+    ).bindparams(**{f'{name}_match': match}).columns(
+        id=db.Integer, score=db.Float
+    ).subquery(name)
+
+
+def search_people(query, search_text):
+    """Restrict a Person query to ``search_text``.
+
+    Returns ``(query, score)`` where ``score`` is a bm25 relevance column (lower
+    is better) or None when the ILIKE fallback was used.
+    """
+    terms = parse_terms(search_text)
+    if not terms:
+        return query, None
+    tokenizer = _fts_usable(terms)
+    if tokenizer is None:
+        for term in terms:
+            query = query.filter(
+                (Person.first_name.ilike(f'%{term}%')) |
+                (Person.last_name.ilike(f'%{term}%')) |
+                (Person.email.ilike(f'%{term}%')) |
+                (Person.department.ilike(f'%{term}%'))
+            )
+        return query, None
+    match = _match_subquery('person_fts', PERSON_WEIGHTS, 'person_match', fts_query(terms, tokenizer))
+    return query.join(match, match.c.id == Person.id), match.c.score
+
+
+def search_items(query, search_text):
+    """Restrict an InventoryItem query (outer-joined to Person) to ``search_text``.
+
+    Returns ``(query, score)`` like search_people().
+    """
+    terms = parse_terms(search_text)
+    if not terms:
+        return query, None
+    tokenizer = _fts_usable(terms)
+    if tokenizer is None:
+        for term in terms:
+            query = query.filter(
+                (InventoryItem.item_type.ilike(f'%{term}%')) |
+                (InventoryItem.serial_number.ilike(f'%{term}%')) |
+                (InventoryItem.details.ilike(f'%{term}%')) |
+                (Person.first_name.ilike(f'%{term}%')) |
+                (Person.last_name.ilike(f'%{term}%'))
+            )
+        return query, None
+    match = _match_subquery('item_fts', ITEM_WEIGHTS, 'item_match', fts_query(terms, tokenizer))
+    return query.join(match, match.c.id == InventoryItem.id), match.c.score
+
+
+def lookup_people(search_text, limit=10):
+    """Typeahead lookup: every term must prefix one of name, email or department."""
+    terms = parse_terms(search_text)
+    if not terms:
+        return []
+    # The FTS (or ILIKE) match narrows candidates to substring hits; the prefix
+    # filter then only runs over those.
+    query, score = search_people(Person.query, search_text)
+    for term in terms:
+        pattern = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(
+            (Person.first_name.ilike(pattern, escape='\\')) |
+            (Person.last_name.ilike(pattern, escape='\\')) |
+            (Person.email.ilike(pattern, escape='\\')) |
+            (Person.department.ilike(pattern, escape='\\'))
+        )
+    order = [score] if score is not None else []
+    order += [Person.last_name, Person.first_name, Person.id]
+    return query.order_by(*order).limit(limit).all()
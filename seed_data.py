@@ -0,0 +1,228 @@
+"""Fill the database with synthetic people, items, users and audit rows.
+
+    python seed_data.py --people 100000 --items 1000000 --audit 10000000
+    python seed_data.py --database sqlite:////tmp/big.sqlite3 --people 5000 --items 50000
+
+Rows are appended after whatever is already there, in batches of plain
+executemany INSERTs. The search, counter and assignment history triggers
+are dropped for the load and the FTS index, dashboard counters and open
+assignments rebuilt once at the end, which is far faster than maintaining
+them row by row. Output is deterministic for
+a given --random-seed and starting database.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Priya', 'Wei', 'Sagar', 'Fatima', 'Mohammed', 'Ana', 'Luis', 'Yuki', 'Olga', 'Kwame']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Patel',
+              'Chen', 'Kim', 'Nguyen', 'Okafor', 'Ivanova', 'Sato', 'Silva', 'Khan', 'Muller', 'Rossi']
+DEPARTMENTS = ['Engineering', 'Sales', 'Marketing', 'Finance', 'HR', 'IT', 'Operations', 'Support',
+               'Legal', 'Facilities', 'Warehouse', 'Executive']
+# (item type, relative frequency, details choices)
+ITEM_TYPES = [
+    ('Laptop', 30, ['14" 16GB', '15" 32GB', '13" 8GB', 'Dev workstation']),
+    ('Monitor', 25, ['24" 1080p', '27" 1440p', '32" 4K']),
+    ('Phone', 15, ['Android', 'iPhone', 'Desk phone']),
+    ('Headset', 10, ['Wired', 'Wireless', 'Noise cancelling']),
+    ('Docking Station', 8, ['USB-C', 'Thunderbolt']),
+    ('Keyboard', 6, ['Wireless', 'Mechanical']),
+    ('Tablet', 4, ['10"', '12"']),
+    ('Printer', 2, ['Laser', 'Inkjet', 'Label']),
+]
+AUDIT_ACTIONS = [('update', 55), ('create', 20), ('login', 12), ('logout', 8), ('delete', 3), ('export', 2)]
+AUDIT_MODELS = {'login': 'User', 'logout': 'User', 'export': 'Person'}
+STOCK_SHARE = 0.15
+
+
+def _weighted(choices):
+    return [c[0] for c in choices], [c[1] for c in choices]
+
+
+def _batches(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def _max_id(conn, table):
+    from sqlalchemy import func, select
+    return conn.execute(select(func.max(table.c.id))).scalar() or 0
+
+
+def _drop_triggers(conn):
+    from sqlalchemy import text
+    names = [name for (name,) in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+        "AND (name LIKE 'person_fts_%' OR name LIKE 'item_fts_%' OR name LIKE 'stat_%' OR name LIKE 'assignment_%')"
+    ))]
+    for name in names:
+        conn.execute(text(f'DROP TRIGGER {name}'))
+    return names
+
+
+def _report(label, count, started):
+    elapsed = time.perf_counter() - started
+    print(f'  {label}: {count:,} rows in {elapsed:.1f}s ({count / elapsed if elapsed else 0:,.0f}/s)', flush=True)
+
+
+def seed(app, people=1000, items=5000, users=10, audit=10000, batch_size=10000, random_seed=42, days=730):
+    """Append synthetic rows; returns the number of rows written per table."""
+    from werkzeug.security import generate_password_hash
+    from create_database import init_database
+    from models import db, Person, InventoryItem, User, AuditLog
+    from search import install_index, rebuild_index
+    import counters
+    import history
+
+    init_database(app)
+    rng = random.Random(random_seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    type_names, type_weights = _weighted(ITEM_TYPES)
+    type_details = {name: details for name, _, details in ITEM_TYPES}
+    action_names, action_weights = _weighted(AUDIT_ACTIONS)
+    person, item, user, audit_log = (m.__table__ for m in (Person, InventoryItem, User, AuditLog))
+
+    with app.app_context():
+        engine = db.engine
+        with engine.begin() as conn:
+            _drop_triggers(conn)
+        try:
+            with engine.connect() as conn:
+                first_person = _max_id(conn, person) + 1
+                first_item = _max_id(conn, item) + 1
+                first_user = _max_id(conn, user) + 1
+
+            started = time.perf_counter()
+            # One hash shared by every generated user; logging in as any of them uses 'benchmark'
+            password = generate_password_hash('benchmark')
+            with engine.begin() as conn:
+                conn.execute(user.insert(), [{
+                    'username': f'user{first_user + n}',
+                    'password': password,
+                    'role': 'admin' if n % 5 == 0 else 'read_only',
+                    'version': 1,
+                } for n in range(users)])
+            _report('users', users, started)
+
+            started = time.perf_counter()
+            for start, size in _batches(people, batch_size):
+                rows = []
+                for n in range(start, start + size):
+                    person_id = first_person + n
+                    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    created = now - timedelta(days=rng.randint(0, days))
+                    rows.append({
+                        'first_name': first_name,
+                        'last_name': last_name,
+                        'email': f'{first_name.lower()}.{last_name.lower()}.{person_id}@example.com',
+                        'department': rng.choice(DEPARTMENTS),
+                        'created_at': created,
+                        'updated_at': created,
+                    })
+                with engine.begin() as conn:
+                    conn.execute(person.insert(), rows)
+            _report('people', people, started)
+
+            person_ids = (first_person, first_person + people - 1) if people else None
+            with engine.connect() as conn:
+                last_person = _max_id(conn, person)
+            started = time.perf_counter()
+            for start, size in _batches(items, batch_size):
+                rows = []
+                for n in range(start, start + size):
+                    item_type = rng.choices(type_names, type_weights)[0]
+                    assigned = None
+                    if last_person and rng.random() >= STOCK_SHARE:
+                        low, high = person_ids or (1, last_person)
+                        assigned = rng.randint(low, high)
+                    created = now - timedelta(days=rng.randint(0, days))
+                    rows.append({
+                        'item_type': item_type,
+                        'serial_number': f'{item_type[:3].upper()}-{first_item + n:09d}',
+                        'details': rng.choice(type_details[item_type]),
+                        'status': 'active' if assigned else 'stock',
+                        'assigned_to_id': assigned,
+                        'created_at': created,
+                        'updated_at': created,
+                    })
+                with engine.begin() as conn:
+                    conn.execute(item.insert(), rows)
+            _report('items', items, started)
+
+            with engine.connect() as conn:
+                last_item = _max_id(conn, item)
+                last_user = _max_id(conn, user)
+            started = time.perf_counter()
+            # Timestamps increase with the row number, as they would in a real log
+            span = timedelta(days=days).total_seconds()
+            origin = now - timedelta(days=days)
+            for start, size in _batches(audit, batch_size):
+                rows = []
+                for n in range(start, start + size):
+                    action = rng.choices(action_names, action_weights)[0]
+                    model_type = AUDIT_MODELS.get(action) or ('InventoryItem' if rng.random() < 0.7 else 'Person')
+                    user_id = rng.randint(1, last_user)
+                    if model_type == 'User':
+                        model_id = user_id
+                    elif model_type == 'InventoryItem':
+                        model_id = rng.randint(1, last_item or 1)
+                    else:
+                        model_id = rng.randint(1, last_person or 1)
+                    rows.append({
+                        'action': action,
+                        'model_type': model_type,
+                        'model_id': model_id,
+                        'user_id': user_id,
+                        'timestamp': origin + timedelta(seconds=span * n / max(audit, 1) + rng.random()),
+                        'details': f'Synthetic {action} of {model_type} {model_id}',
+                    })
+                with engine.begin() as conn:
+                    conn.execute(audit_log.insert(), rows)
+            _report('audit log', audit, started)
+        finally:
+            started = time.perf_counter()
+            # Recreate whatever triggers were there and bring the derived data up to date
+            install_index(engine)
+            counters.install_triggers(engine)
+            history.install_triggers(engine)
+            if people or items:
+                rebuild_index(engine)
+            counters.reconcile()
+            with engine.begin() as conn:
+                history.open_missing(conn)
+                conn.execute(db.text('ANALYZE'))
+            _report('search index, counters, history and statistics', people + items, started)
+
+    return {'user': users, 'person': people, 'inventory_item': items, 'audit_log': audit}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='database URL (default DATABASE_URL or the app default)')
+    parser.add_argument('--people', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--audit', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=730, help='spread created dates and audit rows over this many days')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--random-seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    from app import create_app
+
+    app = create_app()
+    print(f"Seeding {app.config['SQLALCHEMY_DATABASE_URI']}", flush=True)
+    seed(app, args.people, args.items, args.users, args.audit, args.batch_size, args.random_seed, args.days)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
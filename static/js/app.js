@@ -11,37 +11,12 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
-    // Live search for tables
-    const searchInput = document.getElementById('searchInput');
-    if (searchInput) {
-        const table = document.querySelector(searchInput.dataset.table);
-        const noResultsRow = table ? table.querySelector('.no-results') : null;
-
-        if (table) {
-            searchInput.addEventListener('input', () => {
-                const searchTerm = searchInput.value.toLowerCase();
-                const rows = table.querySelectorAll('tbody tr:not(.no-results)');
-                let visibleRows = 0;
-                
-                rows.forEach(row => {
-                    const text = row.textContent.toLowerCase();
-                    if (text.includes(searchTerm)) {
-                        row.style.display = '';
-                        visibleRows++;
-                    } else {
-                        row.style.display = 'none';
-                    }
-                });
-
-                if (noResultsRow) {
-                    noResultsRow.style.display = visibleRows > 0 ? 'none' : '';
-                }
-            });
-        }
-    }
-    
-    // Existing sort functionality (no changes needed)
-    // ...
+    // Live search for list pages: fetches only the results card as you type
+    document.querySelectorAll('[data-live-search]').forEach(initLiveSearch);
+
+    // Employee typeahead for item forms: queries the lookup endpoint instead of
+    // embedding every employee in the page
+    document.querySelectorAll('[data-person-picker]').forEach(initPersonPicker);
 });
 
 function confirmDelete() {
@@ -50,4 +25,184 @@ function confirmDelete() {
 
 function confirmDeleteItem() {
     return confirm('Are you sure you want to delete this item?');
-}
\ No newline at end of file
+}
+
+function debounce(fn, wait) {
+    let timer = null;
+    return (...args) => {
+        clearTimeout(timer);
+        timer = setTimeout(() => fn(...args), wait);
+    };
+}
+
+function initPersonPicker(picker) {
+    const input = picker.querySelector('input[type="text"]');
+    const hidden = picker.querySelector('input[type="hidden"]');
+    const results = picker.querySelector('.person-picker-results');
+    const lookupUrl = picker.dataset.lookupUrl;
+    let controller = null;
+
+    const clearResults = () => {
+        results.innerHTML = '';
+    };
+
+    const choose = (person) => {
+        hidden.value = person.id;
+        input.value = person.name;
+        input.setCustomValidity('');
+        clearResults();
+    };
+
+    const lookup = debounce(async (term) => {
+        if (controller) {
+            controller.abort();
+        }
+        if (!term) {
+            clearResults();
+            return;
+        }
+        controller = new AbortController();
+        try {
+            const response = await fetch(`${lookupUrl}?q=${encodeURIComponent(term)}`, {
+                signal: controller.signal,
+                headers: { 'Accept': 'application/json' },
+            });
+            if (!response.ok) {
+                return;
+            }
+            const people = await response.json();
+            clearResults();
+            if (people.length === 0) {
+                const empty = document.createElement('div');
+                empty.className = 'list-group-item text-secondary';
+                empty.textContent = 'No matching employees';
+                results.appendChild(empty);
+                return;
+            }
+            people.forEach(person => {
+                const option = document.createElement('button');
+                option.type = 'button';
+                option.className = 'list-group-item list-group-item-action';
+                option.textContent = `${person.name} (${person.email}, ${person.department})`;
+                option.addEventListener('click', () => choose(person));
+                results.appendChild(option);
+            });
+        } catch (err) {
+            if (err.name !== 'AbortError') {
+                clearResults();
+            }
+        }
+    }, 250);
+
+    input.addEventListener('input', () => {
+        hidden.value = '';
+        lookup(input.value.trim());
+    });
+
+    input.addEventListener('keydown', (e) => {
+        if (e.key === 'Enter' && results.querySelector('button')) {
+            e.preventDefault();
+            results.querySelector('button').click();
+        } else if (e.key === 'Escape') {
+            clearResults();
+        }
+    });
+
+    document.addEventListener('click', (e) => {
+        if (!picker.contains(e.target)) {
+            clearResults();
+        }
+    });
+
+    const form = picker.closest('form');
+    if (form) {
+        form.addEventListener('submit', (e) => {
+            if (input.required && !hidden.value) {
+                e.preventDefault();
+                input.setCustomValidity('Select an employee from the list.');
+                input.reportValidity();
+            }
+        });
+        input.addEventListener('input', () => input.setCustomValidity(''));
+    }
+}
+
+function initLiveSearch(form) {
+    const input = form.querySelector('input[name="search"]');
+    const results = document.querySelector(form.dataset.liveSearch);
+    if (!input || !results) {
+        return;
+    }
+    const resultsUrl = results.dataset.resultsUrl;
+    let controller = null;
+
+    // Swap in the results for these query args and keep the address bar in step,
+    // so searches and pages stay bookmarkable
+    const load = async (params, historyMode) => {
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        const query = params.toString();
+        try {
+            const response = await fetch(`${resultsUrl}${query ? `?${query}` : ''}`, {
+                signal: controller.signal,
+                headers: { 'Accept': 'text/html' },
+            });
+            if (response.redirected || !response.ok) {
+                // Session expired or server error: fall back to a full page load
+                window.location.href = `${window.location.pathname}${query ? `?${query}` : ''}`;
+                return;
+            }
+            results.innerHTML = await response.text();
+            const url = `${window.location.pathname}${query ? `?${query}` : ''}`;
+            if (historyMode === 'push') {
+                history.pushState(null, '', url);
+            } else if (historyMode === 'replace') {
+                history.replaceState(null, '', url);
+            }
+        } catch (err) {
+            if (err.name !== 'AbortError') {
+                throw err;
+            }
+        }
+    };
+
+    const paramsFor = (term) => {
+        // A new search starts from the first page in the default (relevance) order
+        const params = new URLSearchParams();
+        const perPage = new URLSearchParams(window.location.search).get('per_page');
+        if (term) {
+            params.set('search', term);
+        }
+        if (perPage) {
+            params.set('per_page', perPage);
+        }
+        return params;
+    };
+
+    const search = debounce((term) => load(paramsFor(term), 'replace'), 250);
+
+    input.addEventListener('input', () => search(input.value.trim()));
+
+    form.addEventListener('submit', (e) => {
+        e.preventDefault();
+        load(paramsFor(input.value.trim()), 'push');
+    });
+
+    // Sort headers and pager links load in place too
+    results.addEventListener('click', (e) => {
+        const link = e.target.closest('a[href]');
+        if (!link || link.pathname !== window.location.pathname || e.ctrlKey || e.metaKey || e.shiftKey || e.button !== 0) {
+            return;
+        }
+        e.preventDefault();
+        load(new URLSearchParams(link.search), 'push');
+    });
+
+    window.addEventListener('popstate', () => {
+        const params = new URLSearchParams(window.location.search);
+        input.value = params.get('search') || '';
+        load(params, null);
+    });
+}
@@ -0,0 +1,111 @@
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from cache import TTLCache
+from models import db, User
+
+# Flask-Login user loader backed by an in-process cache, so authenticated
+# requests don't start with a SELECT on the user table.
+#
+# Session ids are "<id>:<version>". User.version is bumped on any password or
+# role change, which (a) drops the cached entry in this process as soon as the
+# change commits and (b) makes every existing session for that user fail the
+# version check on its next cache miss. Other worker processes notice within
+# USER_CACHE_TTL seconds, except on admin-only views, which re-check the
+# version against the database on every request (is_current).
+
+_cache = None
+
+
+class SessionUser(UserMixin):
+    """Detached, read-only snapshot of a User used as ``current_user``."""
+
+    def __init__(self, id, username, role, version):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.version = version
+
+    def get_id(self):
+        return f'{self.id}:{self.version}'
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = TTLCache(
+            maxsize=current_app.config.get('USER_CACHE_SIZE', 1024),
+            ttl=current_app.config.get('USER_CACHE_TTL', 60),
+        )
+    return _cache
+
+
+def parse_session_id(session_id):
+    user_id, _, version = str(session_id).partition(':')
+    try:
+        return int(user_id), int(version)
+    except ValueError:
+        return None, None
+
+
+def load_user(session_id):
+    user_id, version = parse_session_id(session_id)
+    if user_id is None:
+        # Sessions from before versioned ids carry no version; make them log in again
+        return None
+    cache = _get_cache()
+    cached = cache.get(user_id)
+    if cached is not None and cached.version == version:
+        return cached
+    user = db.session.get(User, user_id)
+    if user is None or user.version != version:
+        return None
+    snapshot = SessionUser(user.id, user.username, user.role, user.version)
+    cache.set(user_id, snapshot)
+    return snapshot
+
+
+def is_current(user):
+    """Check a (possibly cached) user's version against the database.
+
+    Admin-only views call this so a demotion or password change made in
+    another worker takes effect immediately rather than after USER_CACHE_TTL.
+    """
+    version = db.session.query(User.version).filter(User.id == user.id).scalar()
+    if version == user.version:
+        return True
+    invalidate(user.id)
+    return False
+
+
+def invalidate(user_id):
+    if _cache is not None:
+        _cache.pop(user_id)
+
+
+@event.listens_for(User, 'before_update')
+def _bump_user_version(mapper, connection, target):
+    state = inspect(target)
+    session = object_session(target)
+    # Upgrading the stored hash on login (passwords.verify_password) keeps the same password
+    rehashed = session is not None and target.id in session.info.get('rehashed_users', ())
+    password_changed = state.attrs.password.history.has_changes() and not rehashed
+    if password_changed or state.attrs.role.history.has_changes():
+        target.version = (target.version or 1) + 1
+        if session is not None:
+            session.info.setdefault('invalidated_users', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    session.info.pop('rehashed_users', None)
+    for user_id in session.info.pop('invalidated_users', ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_invalidated_users(session):
+    session.info.pop('invalidated_users', None)
+    session.info.pop('rehashed_users', None)
@@ -0,0 +1,34 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py sets preload_app, so this module is imported once in the
+master process and the workers are forked from it with the app, its
+compiled templates and the SQLAlchemy mappers already in memory.
+"""
+import logging
+
+from sqlalchemy.orm import configure_mappers
+
+from app import create_app
+from config import ProductionConfig
+from models import db
+from passwords import method_signature
+
+
+def preload(app):
+    # Compile every template now so workers share them copy-on-write
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    configure_mappers()
+    method_signature(app.config['PASSWORD_HASH_METHOD'])
+    with app.app_context():
+        # Connections must not be shared across fork; each worker opens its own
+        for engine in db.engines.values():
+            engine.dispose()
+    if app.config['SECRET_KEY'] == 'your-secret-key-replace-this':
+        logging.getLogger('equipment_tracking').warning('SECRET_KEY is the built-in default; set it in the environment')
+    return app
+
+
+app = preload(create_app(ProductionConfig))